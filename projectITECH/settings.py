@@ -82,6 +82,48 @@ DATABASES = {
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/4.1/topics/cache/
+
+# Pagination counts and chart data are cached per worker process, under keys including the table versions
+# (rmc/utils/table_version.py), which are in the database and shared by the workers,
+# so a write in one worker invalidates the cached values of all of them
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
+
+# Read replica for the staff lists and analytics (rmc/utils/replica.py)
+# A read-only snapshot of the database, copied with the sqlite3 backup API,
+# read by the staff views while it is at most REPLICA_MAX_STALENESS seconds old
+REPLICA_ENABLED = False
+REPLICA_PATH = BASE_DIR / "db.replica.sqlite3"
+REPLICA_MAX_STALENESS = 60
+
+if REPLICA_ENABLED:
+    DATABASES["replica"] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": "file:{}?mode=ro".format(REPLICA_PATH),
+        # The tests read the primary test database instead
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_ROUTERS = ["rmc.utils.replica.ReplicaRouter"]
+
+# SQLite connection profile, applied to every new connection (rmc/utils/sqlite_profile.py)
+# None - the stock configuration (rollback journal, readers and the writer block each other)
+# "production" - WAL journal, synchronous=NORMAL, busy timeout, memory-mapped reads, larger page cache
+SQLITE_PROFILE = None
+# PRAGMAs overriding the profile, e.g. {"busy_timeout": 10000}
+SQLITE_PRAGMAS = {}
+
+# Group commit of the profile and review saves (rmc/utils/write_queue.py)
+# When enabled, the saves are written by one writer thread per process, many per transaction
+WRITE_QUEUE_ENABLED = False
+WRITE_QUEUE_WINDOW_MS = 2
+WRITE_QUEUE_MAX_BATCH = 200
+WRITE_QUEUE_TIMEOUT = 10
+
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
 
@@ -116,6 +158,43 @@ USE_TZ = True
 
 STATIC_URL = "static/"
 
+# ECharts library and themes used to render the charts in the browser
+# The copy vendored under rmc/static/plugins/echarts-<version>/ is served with the static files
+# (fetched with "python manage.py vendor_echarts")
+ECHARTS_VERSION = "4.9.0"
+# None - the vendored copy
+# A URL - loads the files from that host instead (opt-in), e.g. the CDN pyecharts renders against,
+#         "https://assets.pyecharts.org/assets/"
+ECHARTS_ASSETS_HOST = None
+
+# Cold start budget of a worker process (projectITECH.wsgi.application and the URLconf),
+# checked by "python manage.py startup_time"
+STARTUP_TIME_BUDGET_MS = 1000
+
+# Heavy libraries that are imported on first use and must not be loaded when a worker starts
+STARTUP_LAZY_MODULES = ["pyecharts", "PIL"]
+
+# Number of pre-rendered captcha images kept per process (0 renders every captcha in the request)
+CAPTCHA_POOL_SIZE = 200
+
+# Where the captcha answer is kept:
+# "signed" - in a signed, single-use cookie token (no session or database write per captcha,
+#            the used tokens are recorded in memory, so each is accepted once per worker process)
+# "session" - in the session
+CAPTCHA_MODE = "signed"
+CAPTCHA_COOKIE_NAME = "captcha_token"
+CAPTCHA_TOKEN_MAX_AGE = 60
+# Most used tokens remembered per process, within their max age (rmc/utils/captcha_token.py)
+CAPTCHA_NONCE_LIMIT = 100000
+
+# Session storage
+# "rmc.utils.session_lru" - sessions in the database, reads served from an in-process LRU cache (rmc/utils/session_lru.py)
+# "django.contrib.sessions.backends.db" - every request reads its session from the database
+# "django.contrib.sessions.backends.signed_cookies" - the small "info" dict is kept in a signed cookie, no database at all
+SESSION_ENGINE = "rmc.utils.session_lru"
+SESSION_LRU_SIZE = 10000
+SESSION_LRU_TTL = 5
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.1/ref/settings/#default-auto-field
 
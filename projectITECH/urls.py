@@ -1,6 +1,11 @@
 from django.contrib import admin
 from django.urls import path
-from rmc.views import staff, student, login, register
+from rmc.utils.lazy_import import lazy_views
+
+# The view modules are imported when one of their views is first requested
+staff, student, login, register, charts = lazy_views(
+    "rmc.views.staff", "rmc.views.student", "rmc.views.login", "rmc.views.register", "rmc.views.charts",
+)
 
 
 urlpatterns = [
@@ -30,6 +35,11 @@ urlpatterns = [
     path("course-list/", staff.course_list),
     path("<int:courseid>/view-reviews-course/", staff.view_reviews_course),
 
+    # Export reviews
+    path("export-reviews/", staff.export_reviews),
+    path("<int:courseid>/export-reviews-course/", staff.export_reviews_course),
+    path("<int:studentid>/export-reviews-student/", staff.export_reviews_student),
+
     ########################################
 
     # Data visualisation
@@ -37,6 +47,9 @@ urlpatterns = [
     path("data-visualisation/gender-distribution-socs/", staff.gender_distribution_socs),
     path("data-visualisation/degree-programme-enrolment/", staff.degree_programme_enrolment),
 
+    # Chart data API
+    path("api/charts/<str:name>/", charts.chart_api),
+
     ########################################
 
     path("captcha/", login.captcha),
@@ -56,6 +69,7 @@ urlpatterns = [
     path("student-edit/", student.student_edit),
     path('student-course/', student.student_course),
     path('student/addcomment/', student.student_addcomment),
+    path('student/addcomments/', student.student_addcomments),
     path('student-comment/', student.student_comment),
 
 ]
@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class RmcConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "rmc"
+
+    def ready(self):
+        # Bumps the cached table versions whenever rmc rows change
+        from rmc.utils import table_version
+        table_version.connect_signals(self)
+
+        # Applies the SQLite PRAGMAs of settings.SQLITE_PROFILE to every new connection
+        from django.db.backends.signals import connection_created
+        from rmc.utils import sqlite_profile
+        connection_created.connect(sqlite_profile.configure_connection, dispatch_uid="rmc-sqlite-profile")
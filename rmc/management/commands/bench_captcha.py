@@ -0,0 +1,89 @@
+"""
+Captcha microbenchmark
+
+    python manage.py bench_captcha
+    python manage.py bench_captcha --count 1000
+
+Reports captchas per second for:
+(1) before: the font loaded and every noise point drawn one by one on each call, as check_code used to do
+(2) render: check_code_png(), with the cached font and batched noise points
+(3) pool:   CaptchaPool.pop() from a filled pool, i.e. the cost left in the /captcha/ request
+"""
+
+import random
+import time
+from io import BytesIO
+
+from django.core.management.base import BaseCommand
+from PIL import Image, ImageDraw, ImageFont, ImageFilter
+
+from rmc.utils.captcha import check_code_png, CaptchaPool
+
+
+def legacy_check_code_png(width=120, height=30, char_length=5, font_file='Monaco.ttf', font_size=28):
+    # The check_code implementation before the font cache and the batched noise points
+    code = []
+    img = Image.new(mode='RGB', size=(width, height), color=(255, 255, 255))
+    draw = ImageDraw.Draw(img, mode='RGB')
+
+    def rndColor():
+        return (random.randint(0, 255), random.randint(10, 255), random.randint(64, 255))
+
+    font = ImageFont.truetype(font_file, font_size)
+    for i in range(char_length):
+        char = chr(random.randint(65, 90))
+        code.append(char)
+        draw.text([i * width / char_length, random.randint(0, 4)], char, font=font, fill=rndColor())
+
+    for i in range(40):
+        draw.point([random.randint(0, width), random.randint(0, height)], fill=rndColor())
+
+    for i in range(40):
+        draw.point([random.randint(0, width), random.randint(0, height)], fill=rndColor())
+        x = random.randint(0, width)
+        y = random.randint(0, height)
+        draw.arc((x, y, x + 4, y + 4), 0, 90, fill=rndColor())
+
+    for i in range(5):
+        draw.line((random.randint(0, width), random.randint(0, height),
+                   random.randint(0, width), random.randint(0, height)), fill=rndColor())
+
+    img = img.filter(ImageFilter.EDGE_ENHANCE_MORE)
+    stream = BytesIO()
+    img.save(stream, "png")
+    return stream.getvalue(), ''.join(code)
+
+
+class Command(BaseCommand):
+    help = "Measures captchas per second before and after the font cache and the captcha pool"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, default=300, help="Number of captchas per measurement")
+
+    def measure(self, label, func, count):
+        start = time.perf_counter()
+        for _ in range(count):
+            func()
+        elapsed = time.perf_counter() - start
+
+        rate = count / elapsed
+        self.stdout.write("  {:<8} {:>10.1f} captchas/s  ({:.3f} ms each)".format(label, rate, elapsed / count * 1000))
+        return rate
+
+    def handle(self, *args, **options):
+        count = options["count"]
+
+        self.stdout.write("Captcha throughput over {} captchas".format(count))
+        before = self.measure("before", legacy_check_code_png, count)
+        render = self.measure("render", check_code_png, count)
+
+        # Fills the pool first, the refills then happen in the background thread
+        pool = CaptchaPool(size=count)
+        pool.start()
+        while len(pool.captchas) < count:
+            time.sleep(0.01)
+        pool.refill_at = 0
+        pooled = self.measure("pool", pool.pop, count)
+
+        self.stdout.write("  render is {:.1f}x and pool is {:.1f}x the captchas/s before".format(
+            render / before, pooled / before))
@@ -0,0 +1,341 @@
+"""
+Latency, query count, SQL time and response size of every route
+
+    python manage.py bench_endpoints --output before.json
+    python manage.py bench_endpoints --database-file /tmp/seeded.sqlite3 --requests 50 --output after.json
+    python manage.py bench_endpoints --compare before.json after.json
+
+Logs in a student and a staff member with the Django test client (the session info the login views set),
+then requests every route of projectITECH/urls.py as the role the route requires:
+- the URL parameters are filled with sample rows: the benchmark student, a staff member,
+  the course with the most reviews, every chart name
+- the write endpoints (POST_REQUESTS) are also posted to with a valid form, those in POST_ONLY_ROUTES only
+- routes in SKIPPED_ROUTES are reported as skipped
+Everything runs in one transaction that is rolled back at the end, so the database is left unchanged.
+
+For each endpoint the report has the p50/p95/mean latency, the median number of SQL queries and SQL time,
+and the response size. The SQL time is the time spent executing the queries, the rows a streamed response
+fetches afterwards (e.g. the exports) only count in its latency.
+--compare flags the endpoints of the second report that are slower (p95), run more queries
+or send more bytes than in the first, and fails when there is any.
+
+Seed a large database first with "python manage.py seed_scale" (on a copy, given with --database-file).
+"""
+
+import contextlib
+import datetime
+import json
+import re
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.urls import URLPattern, URLResolver, get_resolver
+
+from rmc import models
+from rmc.middleware import routes
+from rmc.utils import replica
+
+# Routes that are not requested, with the reason
+SKIPPED_ROUTES = {
+    "<int:courseid>/course-delete/": "deletes the sample course used by the other routes",
+    "logout/": "ends the benchmark session",
+    "staff-logout/": "ends the benchmark session",
+}
+
+# <int:courseid> in a route
+ROUTE_PARAMETER = re.compile(r"<(?:\w+:)?(\w+)>")
+
+SCORES = {"overall_score": 7, "easiness_score": 6, "interest_score": 8, "usefulness_score": 7, "teaching_score": 6}
+
+
+def post_student_edit(samples):
+    student = samples["student"]
+    return {"data": {"name": student.name, "gender": student.gender, "age": student.age}}
+
+
+def post_student_addcomment(samples):
+    # Only the first request inserts, the next ones are rejected by the unique constraint
+    return {"path_suffix": "?uid={}".format(samples["unreviewed_course_id"]),
+            "data": dict(SCORES, comment="Benchmark review")}
+
+
+def post_student_addcomments(samples):
+    reviews = [dict(SCORES, course_id=course_id, comment="Benchmark review")
+               for course_id in samples["programme_course_ids"]]
+    return {"data": json.dumps({"reviews": reviews}), "content_type": "application/json"}
+
+
+def post_course_edit(samples):
+    course = samples["course"]
+    return {"data": {"name": course.name,
+                     "associated_degree_programmes": [i.id for i in course.associated_degree_programmes.all()]}}
+
+
+# Write endpoints posted to, route -> function returning the request arguments
+POST_REQUESTS = {
+    "student-edit/": post_student_edit,
+    "student/addcomment/": post_student_addcomment,
+    "student/addcomments/": post_student_addcomments,
+    "<int:courseid>/course-edit/": post_course_edit,
+}
+
+# Write endpoints answering GET requests with 405, which are only posted to
+POST_ONLY_ROUTES = {"student/addcomments/"}
+
+
+class QueryTimer(object):
+    # Database execute wrapper counting the queries and adding up their time
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - start
+
+
+def percentile(values, percent):
+    if len(values) < 2:
+        return values[0] if values else 0
+    return statistics.quantiles(values, n=100, method="inclusive")[percent - 1]
+
+
+class Command(BaseCommand):
+    help = "Benchmarks every route as a logged-in student or staff member and writes a JSON report"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=20, help="Measured requests per endpoint")
+        parser.add_argument("--warmup", type=int, default=2, help="Requests per endpoint before measuring")
+        parser.add_argument("--output", help="JSON report file, printed when not given")
+        parser.add_argument("--database-file", help="SQLite file to run against instead of the configured database")
+        parser.add_argument("--student-email", help="Student to log in as, defaults to the one with the most reviews")
+        parser.add_argument("--staff-email", help="Staff member to log in as, defaults to the first one")
+        parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"),
+                            help="Compares two reports instead of running the benchmark")
+        parser.add_argument("--threshold", type=float, default=0.2,
+                            help="Relative increase of p95 latency or response size flagged as a regression")
+        parser.add_argument("--min-ms", type=float, default=2.0,
+                            help="Smallest p95 latency increase flagged as a regression, in ms")
+
+    ########################################
+
+    # Sample rows the route parameters and the posted forms are filled with
+
+    def get_samples(self, options):
+        students = models.Student.objects.select_related("degree_programme")
+        if options["student_email"]:
+            student = students.filter(email=options["student_email"]).first()
+        else:
+            student = students.annotate(review_count=Count("coursereview")).order_by("-review_count", "id").first()
+        staff = models.Staff.objects.filter(email=options["staff_email"]).first() if options["staff_email"] \
+            else models.Staff.objects.order_by("id").first()
+        course = models.Course.objects.annotate(review_count=Count("coursereview")) \
+            .order_by("-review_count", "id").first()
+        if student is None or staff is None or course is None:
+            raise CommandError("A student, a staff member and a course are needed, run seed_scale first")
+
+        programme_courses = models.Course.objects.filter(associated_degree_programmes=student.degree_programme_id)
+        unreviewed = programme_courses.exclude(coursereview__student_id=student.id).order_by("id")
+        return {
+            "student": student,
+            "staff": staff,
+            "course": course,
+            "unreviewed_course_id": unreviewed.values_list("id", flat=True).first() or course.id,
+            "programme_course_ids": list(programme_courses.order_by("id").values_list("id", flat=True)[:3]),
+            "params": {"studentid": [student.id], "staffid": [staff.id], "courseid": [course.id]},
+        }
+
+    def get_endpoints(self, samples):
+        """ Returns [(name, method, path, role, request kwargs)] and {name: reason} of the skipped routes """
+        from rmc.views.charts import CHARTS
+
+        params = dict(samples["params"], name=list(CHARTS))
+        endpoints = []
+        skipped = {}
+
+        for url_pattern in get_resolver().url_patterns:
+            route = str(url_pattern.pattern)
+
+            # Included URLconfs (admin/) are requested at their root
+            if isinstance(url_pattern, URLResolver):
+                endpoints.append(("GET " + route, "GET", "/" + route, routes.PREFIX_ROLES.get(route), {}))
+                continue
+            if not isinstance(url_pattern, URLPattern):
+                continue
+            if route in SKIPPED_ROUTES:
+                skipped[route] = SKIPPED_ROUTES[route]
+                continue
+
+            role = routes.VIEW_MODULE_ROLES.get(routes.view_module(url_pattern.callback), routes.LOGGED_IN)
+            converters = list(getattr(url_pattern.pattern, "converters", {}))
+            missing = [i for i in converters if i not in params]
+            if missing:
+                skipped[route] = "no sample value for {}".format(", ".join(missing))
+                continue
+
+            # One endpoint per sample value, e.g. per chart name
+            values = [{}]
+            for converter in converters:
+                values = [dict(i, **{converter: value}) for i in values for value in params[converter]]
+
+            for kwargs in values:
+                path = "/" + ROUTE_PARAMETER.sub(lambda match: str(kwargs[match.group(1)]), route)
+                suffix = " [{}]".format(kwargs["name"]) if "name" in kwargs else ""
+                if route not in POST_ONLY_ROUTES:
+                    endpoints.append(("GET " + route + suffix, "GET", path, role, {}))
+
+                if route in POST_REQUESTS:
+                    endpoints.append(("POST " + route + suffix, "POST", path, role, POST_REQUESTS[route](samples)))
+
+        return endpoints, skipped
+
+    ########################################
+
+    def login(self, user, role):
+        # The session info set by the login views
+        client = Client()
+        session = client.session
+        session["info"] = {"id": user.id, "email": user.email, "name": user.name, "role": role}
+        session.save()
+        client.cookies[settings.SESSION_COOKIE_NAME] = session.session_key
+        return client
+
+    def measure(self, client, method, path, request_kwargs, requests, warmup):
+        kwargs = dict(request_kwargs)
+        path += kwargs.pop("path_suffix", "")
+        send = client.post if method == "POST" else client.get
+
+        # The replica is only read when it is enabled
+        aliases = [DEFAULT_DB_ALIAS]
+        if replica.is_enabled():
+            aliases.append(replica.REPLICA_ALIAS)
+
+        latencies, query_counts, sql_times = [], [], []
+        status, size = None, 0
+        for i in range(warmup + requests):
+            timer = QueryTimer()
+            with contextlib.ExitStack() as stack:
+                for alias in aliases:
+                    stack.enter_context(connections[alias].execute_wrapper(timer))
+                start = time.perf_counter()
+                response = send(path, **kwargs)
+                # Streamed responses run their queries while the content is read
+                body = b"".join(response.streaming_content) if response.streaming else response.content
+                elapsed = time.perf_counter() - start
+
+            if i < warmup:
+                continue
+            latencies.append(elapsed * 1000)
+            query_counts.append(timer.count)
+            sql_times.append(timer.seconds * 1000)
+            status, size = response.status_code, len(body)
+
+        return {
+            "status": status,
+            "p50_ms": round(percentile(latencies, 50), 3),
+            "p95_ms": round(percentile(latencies, 95), 3),
+            "mean_ms": round(statistics.fmean(latencies), 3),
+            "queries": statistics.median_low(query_counts),
+            "sql_ms": round(statistics.median(sql_times), 3),
+            "bytes": size,
+        }
+
+    def run_benchmark(self, options):
+        if options["database_file"]:
+            # Every connection opened from now on uses the given file
+            connection.close()
+            connection.settings_dict["NAME"] = options["database_file"]
+
+        report = {
+            "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "database": str(connection.settings_dict["NAME"]),
+            "requests": options["requests"],
+            "rows": {model._meta.db_table: model.objects.count()
+                     for model in (models.Student, models.Staff, models.Course, models.CourseReview)},
+            "endpoints": {},
+            "skipped": {},
+        }
+
+        # The group commit writer would wait for the write lock held by the benchmark transaction
+        with override_settings(ALLOWED_HOSTS=["testserver"], WRITE_QUEUE_ENABLED=False), transaction.atomic():
+            samples = self.get_samples(options)
+            clients = {
+                routes.STUDENT: self.login(samples["student"], "student"),
+                routes.STAFF: self.login(samples["staff"], "staff"),
+                routes.PUBLIC: Client(),
+            }
+            clients[routes.LOGGED_IN] = clients[routes.STUDENT]
+
+            endpoints, report["skipped"] = self.get_endpoints(samples)
+            for name, method, path, role, request_kwargs in endpoints:
+                client = clients.get(role, clients[routes.PUBLIC])
+                result = self.measure(client, method, path, request_kwargs, options["requests"], options["warmup"])
+                result["role"] = role
+                report["endpoints"][name] = result
+                self.stderr.write("  {:<58}{:>5}{:>10.2f} ms p95{:>6} queries".format(
+                    name, result["status"], result["p95_ms"], result["queries"]))
+
+            # Leaves no benchmark sessions or reviews behind
+            transaction.set_rollback(True)
+
+        return report
+
+    ########################################
+
+    def compare(self, before_path, after_path, options):
+        with open(before_path) as f:
+            before = json.load(f)["endpoints"]
+        with open(after_path) as f:
+            after = json.load(f)["endpoints"]
+
+        threshold = options["threshold"]
+        regressions = 0
+        self.stdout.write("  {:<58}{:>20}{:>12}{:>18}".format("endpoint", "p95 ms", "queries", "bytes"))
+
+        for name in sorted(set(before) | set(after)):
+            if name not in before or name not in after:
+                self.stdout.write("  {:<58}{}".format(name, "only in " + (after_path if name in after else before_path)))
+                continue
+            old, new = before[name], after[name]
+
+            problems = []
+            if new["status"] != old["status"]:
+                problems.append("status {} -> {}".format(old["status"], new["status"]))
+            if new["p95_ms"] - old["p95_ms"] > max(options["min_ms"], old["p95_ms"] * threshold):
+                problems.append("slower")
+            if new["queries"] > old["queries"]:
+                problems.append("more queries")
+            if new["bytes"] > old["bytes"] * (1 + threshold):
+                problems.append("larger")
+            regressions += bool(problems)
+
+            self.stdout.write("  {:<58}{:>9.1f} ->{:>7.1f}{:>5g} ->{:>4g}{:>8} ->{:>8}  {}".format(
+                name, old["p95_ms"], new["p95_ms"], old["queries"], new["queries"], old["bytes"], new["bytes"],
+                self.style.ERROR(", ".join(problems)) if problems else ""))
+
+        if regressions:
+            raise CommandError("{} endpoint(s) regressed".format(regressions))
+        self.stdout.write(self.style.SUCCESS("No regressions"))
+
+    def handle(self, *args, **options):
+        if options["compare"]:
+            return self.compare(*options["compare"], options)
+
+        report = self.run_benchmark(options)
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(output + "\n")
+            self.stdout.write(self.style.SUCCESS("{} endpoints written to {}".format(
+                len(report["endpoints"]), options["output"])))
+        else:
+            self.stdout.write(output)
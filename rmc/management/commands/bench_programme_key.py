@@ -0,0 +1,102 @@
+"""
+Storage and join cost of the degree programme key of rmc_student
+
+    python manage.py bench_programme_key
+    python manage.py bench_programme_key --students 1000000 --programmes 40
+
+Builds two copies of rmc_student in a scratch SQLite file, one keyed on the programme name
+(the layout before migration 0016) and one keyed on the programme id, with the same seeded rows.
+Reports the size of the table and of its programme index, and the time of the joins the views run:
+the enrolment count of the chart and the programme name lookup of the student list.
+"""
+
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+LAYOUTS = [
+    # (name, column type, value stored for programme i, join condition)
+    ("name key", "varchar(32)", lambda i: "Degree Programme {:02d} MSc".format(i), "s.degree_programme_id = p.name"),
+    ("integer key", "bigint", lambda i: i, "s.degree_programme_id = p.id"),
+]
+
+QUERIES = [
+    ("enrolment count", """
+        SELECT p.name, COUNT(s.id) FROM rmc_degreeprogramme p
+        LEFT JOIN rmc_student_{layout} s ON {join} GROUP BY p.name
+    """),
+    ("student list page", """
+        SELECT s.id, s.name, p.name FROM rmc_student_{layout} s
+        INNER JOIN rmc_degreeprogramme p ON {join} ORDER BY s.id LIMIT 10 OFFSET {offset}
+    """),
+    ("students of one programme", """
+        SELECT COUNT(*) FROM rmc_student_{layout} s
+        INNER JOIN rmc_degreeprogramme p ON {join} WHERE p.id = 1
+    """),
+]
+
+
+class Command(BaseCommand):
+    help = "Compares a name and an integer degree programme key on a seeded copy of rmc_student"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--students", type=int, default=500000, help="Number of seeded students")
+        parser.add_argument("--programmes", type=int, default=20, help="Number of seeded degree programmes")
+        parser.add_argument("--repeat", type=int, default=5, help="Runs of each query, the median is reported")
+        parser.add_argument("--seed", type=int, default=0, help="Random seed of the generated rows")
+
+    def handle(self, *args, **options):
+        students = options["students"]
+        programmes = options["programmes"]
+        rng = random.Random(options["seed"])
+        assignments = [rng.randint(1, programmes) for _ in range(students)]
+
+        with tempfile.TemporaryDirectory() as directory:
+            conn = sqlite3.connect(os.path.join(directory, "bench.sqlite3"))
+
+            # (1) The programmes, and one student table per layout with the same rows
+            conn.execute("CREATE TABLE rmc_degreeprogramme "
+                         "(id integer PRIMARY KEY, name varchar(32) NOT NULL UNIQUE, level smallint NOT NULL)")
+            conn.executemany("INSERT INTO rmc_degreeprogramme VALUES (?, ?, 2)",
+                             [(i, LAYOUTS[0][2](i)) for i in range(1, programmes + 1)])
+
+            for index, (_, column_type, value, _) in enumerate(LAYOUTS):
+                conn.execute("CREATE TABLE rmc_student_{} (id integer PRIMARY KEY, name varchar(32) NOT NULL, "
+                             "degree_programme_id {} NOT NULL)".format(index, column_type))
+                conn.executemany("INSERT INTO rmc_student_{} VALUES (?, ?, ?)".format(index),
+                                 ((i, "Student {}".format(i), value(p)) for i, p in enumerate(assignments, start=1)))
+                conn.execute("CREATE INDEX rmc_student_{0}_programme ON rmc_student_{0} (degree_programme_id)"
+                             .format(index))
+            conn.commit()
+            conn.execute("ANALYZE")
+
+            # (2) Sizes from the dbstat table
+            sizes = dict(conn.execute("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name"))
+
+            self.stdout.write("{} students in {} degree programmes".format(students, programmes))
+            self.stdout.write("  {:28}{:>16}{:>16}".format("", *(name for name, *_ in LAYOUTS)))
+            self.stdout.write("  {:28}{:>13.1f} MB{:>13.1f} MB".format(
+                "table size", *(sizes["rmc_student_{}".format(i)] / 2 ** 20 for i in range(len(LAYOUTS)))))
+            self.stdout.write("  {:28}{:>13.1f} MB{:>13.1f} MB".format(
+                "programme index size",
+                *(sizes["rmc_student_{}_programme".format(i)] / 2 ** 20 for i in range(len(LAYOUTS)))))
+
+            # (3) Median time of each query
+            for label, sql in QUERIES:
+                timings = []
+                for index, (_, _, _, join) in enumerate(LAYOUTS):
+                    query = sql.format(layout=index, join=join, offset=students // 2)
+                    runs = []
+                    for _ in range(options["repeat"]):
+                        start = time.perf_counter()
+                        conn.execute(query).fetchall()
+                        runs.append(time.perf_counter() - start)
+                    timings.append(statistics.median(runs) * 1000)
+                self.stdout.write("  {:28}{:>13.2f} ms{:>13.2f} ms".format(label, *timings))
+
+            conn.close()
@@ -0,0 +1,78 @@
+"""
+Authenticated request throughput under each session engine
+
+    python manage.py bench_sessions
+    python manage.py bench_sessions --requests 2000 --path /student-comment/
+
+Logs in as the first student through a session of each engine and requests the page repeatedly
+with the Django test client. Reports requests per second, and SQL queries per request
+(all queries, and those on django_session). Runs in a transaction that is rolled back at the end.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from rmc import models
+from rmc.utils.session_lru import session_lru
+
+ENGINES = [
+    ("db", "django.contrib.sessions.backends.db"),
+    ("lru_db", "rmc.utils.session_lru"),
+    ("signed_cookies", "django.contrib.sessions.backends.signed_cookies"),
+]
+
+
+class Command(BaseCommand):
+    help = "Measures authenticated request throughput under each session engine"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=500, help="Number of requests per engine")
+        parser.add_argument("--path", default="/student-info/", help="Page requested as the logged-in student")
+
+    def measure(self, engine, student, path, requests):
+        with override_settings(SESSION_ENGINE=engine, ALLOWED_HOSTS=["testserver"]):
+            session_lru.clear()
+
+            # Logs in, the same way as the login view does
+            client = Client()
+            session = client.session
+            session["info"] = {"id": student.id, "email": student.email, "name": student.name, "role": "student"}
+            session.save()
+            client.cookies[settings.SESSION_COOKIE_NAME] = session.session_key
+
+            # Warms up the URLconf, templates and caches
+            for _ in range(10):
+                response = client.get(path)
+                if response.status_code != 200:
+                    raise CommandError("{} returned {} under {}".format(path, response.status_code, engine))
+
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                for _ in range(requests):
+                    client.get(path)
+                elapsed = time.perf_counter() - start
+
+        session_queries = [q for q in queries.captured_queries if "django_session" in q["sql"]]
+        return requests / elapsed, len(queries) / requests, len(session_queries) / requests
+
+    def handle(self, *args, **options):
+        student = models.Student.objects.first()
+        if student is None:
+            raise CommandError("There is no student in the database")
+
+        self.stdout.write("GET {} as a logged-in student, {} requests per engine".format(
+            options["path"], options["requests"]))
+        self.stdout.write("  {:<16} {:>10} {:>16} {:>18}".format("engine", "req/s", "queries/req", "session q/req"))
+
+        with transaction.atomic():
+            for name, engine in ENGINES:
+                rate, queries, session_queries = self.measure(engine, student, options["path"], options["requests"])
+                self.stdout.write("  {:<16} {:>10.1f} {:>16.2f} {:>18.2f}".format(name, rate, queries, session_queries))
+
+            # Leaves no benchmark sessions behind
+            transaction.set_rollback(True)
@@ -0,0 +1,133 @@
+"""
+Concurrent read/write throughput of SQLite under each connection profile
+
+    python manage.py bench_sqlite
+    python manage.py bench_sqlite --readers 8 --writers 4 --seconds 10
+
+Copies the database to a scratch file per profile, then runs reader and writer threads against it,
+each with its own connection configured like a Django connection under that profile:
+- readers run the course list query (review counts and average scores per course)
+- writers update the comment of a random review, one transaction per write, like a review edit
+
+Reports reads and writes per second, the "database is locked" errors of each, and the p95 write latency.
+"""
+
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Avg, Count
+
+from rmc import models
+from rmc.utils import sqlite_profile
+
+# The default timeout of the sqlite3 module, which Django uses when OPTIONS has no "timeout"
+DJANGO_CONNECT_TIMEOUT = 5.0
+
+
+class Worker(threading.Thread):
+
+    def __init__(self, path, pragmas, deadline, operation):
+        super().__init__(daemon=True)
+        self.path = path
+        self.pragmas = pragmas
+        self.deadline = deadline
+        self.operation = operation
+        self.done = 0
+        self.errors = 0
+        self.latencies = []
+
+    def run(self):
+        # Autocommit with explicit transactions, as Django opens its SQLite connections
+        conn = sqlite3.connect(self.path, timeout=DJANGO_CONNECT_TIMEOUT, isolation_level=None,
+                               check_same_thread=False)
+        sqlite_profile.apply_pragmas(conn, self.pragmas)
+        rng = random.Random(id(self))
+
+        while time.perf_counter() < self.deadline:
+            start = time.perf_counter()
+            try:
+                self.operation(conn, rng)
+                self.done += 1
+                self.latencies.append(time.perf_counter() - start)
+            except sqlite3.OperationalError as e:
+                if "locked" not in str(e) and "busy" not in str(e):
+                    raise
+                self.errors += 1
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+        conn.close()
+
+
+class Command(BaseCommand):
+    help = "Measures concurrent read/write throughput and lock errors under each SQLite profile"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--readers", type=int, default=4, help="Number of reader threads")
+        parser.add_argument("--writers", type=int, default=2, help="Number of writer threads")
+        parser.add_argument("--seconds", type=float, default=5, help="Duration of each run")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("The default database is not SQLite")
+
+        review_ids = list(models.CourseReview.objects.values_list("id", flat=True))
+        if not review_ids:
+            raise CommandError("There are no reviews to update")
+
+        # (1) The read is the SQL of the course list page
+        read_sql, read_params = models.Course.objects.annotate(
+            review_count=Count("coursereview"),
+            avg_overall_score=Avg("coursereview__overall_score"),
+            avg_teaching_score=Avg("coursereview__teaching_score"),
+        ).order_by("id")[:10].query.sql_with_params()
+
+        def read(conn, rng):
+            conn.execute(read_sql, read_params).fetchall()
+
+        def write(conn, rng):
+            conn.execute("BEGIN")
+            conn.execute("UPDATE rmc_coursereview SET comment = ? WHERE id = ?",
+                         ("Benchmark comment {}".format(rng.random()), rng.choice(review_ids)))
+            conn.execute("COMMIT")
+
+        # (2) The profiles compared, and the configured one when its PRAGMAs are overridden
+        profiles = [(name or "stock", sqlite_profile.get_pragmas(name)) for name in sqlite_profile.PROFILES]
+        if settings.SQLITE_PRAGMAS:
+            profiles.append(("settings", sqlite_profile.get_pragmas(settings.SQLITE_PROFILE, settings.SQLITE_PRAGMAS)))
+
+        self.stdout.write("{} readers, {} writers, {}s per profile".format(
+            options["readers"], options["writers"], options["seconds"]))
+        self.stdout.write("  {:12}{:>10}{:>10}{:>14}{:>14}{:>16}".format(
+            "profile", "reads/s", "writes/s", "read errors", "write errors", "write p95 ms"))
+
+        source = settings.DATABASES["default"]["NAME"]
+        for name, pragmas in profiles:
+            with tempfile.TemporaryDirectory() as directory:
+                # (3) A fresh copy per profile, so the WAL mode of one run does not carry over to the next
+                path = os.path.join(directory, "bench.sqlite3")
+                shutil.copyfile(source, path)
+
+                deadline = time.perf_counter() + options["seconds"]
+                readers = [Worker(path, pragmas, deadline, read) for _ in range(options["readers"])]
+                writers = [Worker(path, pragmas, deadline, write) for _ in range(options["writers"])]
+                for worker in readers + writers:
+                    worker.start()
+                for worker in readers + writers:
+                    worker.join()
+
+            reads = sum(w.done for w in readers)
+            writes = sum(w.done for w in writers)
+            write_latencies = [i for w in writers for i in w.latencies]
+            p95 = statistics.quantiles(write_latencies, n=20)[-1] * 1000 if len(write_latencies) > 1 else 0
+            self.stdout.write("  {:12}{:>10.0f}{:>10.0f}{:>14}{:>14}{:>16.2f}".format(
+                name, reads / options["seconds"], writes / options["seconds"],
+                sum(w.errors for w in readers), sum(w.errors for w in writers), p95))
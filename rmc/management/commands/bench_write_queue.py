@@ -0,0 +1,104 @@
+"""
+Write throughput of concurrent review saves, with and without the group commit writer
+
+    python manage.py bench_write_queue
+    python manage.py bench_write_queue --threads 32 --seconds 10 --sqlite-profile production
+
+Points the default database at a scratch copy, then runs request threads that each save a review
+again and again (the comment changes, like a review edit), through rmc.utils.write_queue.save():
+- direct: every save is its own transaction on the thread's connection
+- group commit: the saves are handed to the writer thread, many per transaction
+
+Reports saves per second, failed saves and the p50/p95 latency of a save.
+"""
+
+import os
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import override_settings
+
+from rmc import models
+from rmc.utils import sqlite_profile, write_queue
+
+
+class Command(BaseCommand):
+    help = "Measures concurrent review save throughput with and without the group commit writer"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=16, help="Number of request threads")
+        parser.add_argument("--seconds", type=float, default=5, help="Duration of each run")
+        parser.add_argument("--sqlite-profile", choices=[i for i in sqlite_profile.PROFILES if i],
+                            help="SQLite profile of the connections, defaults to settings.SQLITE_PROFILE")
+
+    def run_threads(self, reviews, threads, seconds):
+        deadline = time.perf_counter() + seconds
+        latencies = []
+        errors = []
+
+        def request_thread(index):
+            # Each thread saves its own reviews, as each student edits their own
+            own = reviews[index::threads]
+            n = 0
+            while time.perf_counter() < deadline:
+                review = own[n % len(own)]
+                review.comment = "Benchmark comment {}".format(n)
+                n += 1
+                start = time.perf_counter()
+                try:
+                    write_queue.save(review)
+                    latencies.append(time.perf_counter() - start)
+                except Exception as e:
+                    errors.append(e)
+            connections.close_all()
+
+        workers = [threading.Thread(target=request_thread, args=(i,)) for i in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return latencies, errors
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("The default database is not SQLite")
+
+        threads = options["threads"]
+        profile = options["sqlite_profile"] or settings.SQLITE_PROFILE
+
+        with tempfile.TemporaryDirectory() as directory:
+            # (1) Every connection opened from now on uses the scratch copy
+            path = os.path.join(directory, "bench.sqlite3")
+            shutil.copyfile(settings.DATABASES["default"]["NAME"], path)
+            connection.close()
+            connection.settings_dict["NAME"] = path
+
+            with override_settings(SQLITE_PROFILE=profile):
+                reviews = list(models.CourseReview.objects.all())
+                if len(reviews) < threads:
+                    raise CommandError("There are fewer reviews than threads")
+
+                self.stdout.write("{} request threads, {}s per run, SQLite profile {}".format(
+                    threads, options["seconds"], profile or "stock"))
+                self.stdout.write("  {:14}{:>10}{:>10}{:>10}{:>10}".format(
+                    "write path", "saves/s", "errors", "p50 ms", "p95 ms"))
+
+                # (2) The same saves, in their own transactions and then through the writer thread
+                for name, enabled in (("direct", False), ("group commit", True)):
+                    with override_settings(WRITE_QUEUE_ENABLED=enabled):
+                        latencies, errors = self.run_threads(reviews, threads, options["seconds"])
+
+                    quantiles = statistics.quantiles(latencies, n=20) if len(latencies) > 1 else [0] * 19
+                    self.stdout.write("  {:14}{:>10.0f}{:>10}{:>10.2f}{:>10.2f}".format(
+                        name, len(latencies) / options["seconds"], len(errors),
+                        quantiles[9] * 1000, quantiles[18] * 1000))
+                    if errors:
+                        self.stderr.write("  first error: {!r}".format(errors[0]))
+
+            connections.close_all()
@@ -0,0 +1,80 @@
+"""
+Imports course reviews from a CSV or JSONL file
+
+    python manage.py import_reviews reviews.jsonl --checkpoint reviews.offset
+
+Columns / keys:
+    student_id or student_email
+    course_id or course (the course name)
+    overall_score, easiness_score, interest_score, usefulness_score, teaching_score (1-10)
+    comment (optional)
+
+A review of a course the student has already reviewed (in the database or earlier in the file) is skipped.
+"""
+
+from rmc import models
+from rmc.utils.bulk_import import BaseImportCommand, text_value
+
+# Students per query when looking up the existing reviews, below the SQLite limit of query parameters
+LOOKUP_BATCH_SIZE = 900
+
+SCORE_FIELDS = ["overall_score", "easiness_score", "interest_score", "usefulness_score", "teaching_score"]
+
+
+class Command(BaseImportCommand):
+    help = "Streams course reviews from a CSV or JSONL file into rmc_coursereview with batched bulk_create"
+    model = models.CourseReview
+
+    def build_lookups(self):
+        self.student_ids = set(models.Student.objects.values_list("id", flat=True))
+        self.student_emails = dict(models.Student.objects.exclude(email=None).values_list("email", "id"))
+        self.course_ids = set(models.Course.objects.values_list("id", flat=True))
+        self.course_names = dict(models.Course.objects.values_list("name", "id"))
+
+    def resolve(self, record, id_key, name_key, ids, names):
+        if record.get(id_key) not in (None, ""):
+            value = int(record[id_key])
+            if value not in ids:
+                raise ValueError("unknown {} {}".format(id_key, value))
+            return value
+
+        value = names.get(record.get(name_key))
+        if value is None:
+            raise ValueError("unknown {} {!r}".format(name_key, record.get(name_key)))
+        return value
+
+    def make_object(self, record):
+        scores = {}
+        for field in SCORE_FIELDS:
+            score = int(record[field])
+            if not 1 <= score <= 10:
+                raise ValueError("{} must be between 1 and 10".format(field))
+            scores[field] = score
+
+        comment = text_value(record, "comment", required=False)
+        if len(comment) > 300:
+            raise ValueError("comment is longer than 300 characters")
+
+        return models.CourseReview(
+            student_id_id=self.resolve(record, "student_id", "student_email", self.student_ids, self.student_emails),
+            course_id_id=self.resolve(record, "course_id", "course", self.course_ids, self.course_names),
+            comment=comment,
+            **scores,
+        )
+
+    def drop_existing(self, chunk):
+        # The (student, course) pairs already reviewed by the students of the chunk, found with the student index
+        student_ids = list({review.student_id_id for review in chunk})
+        reviewed = set()
+        for i in range(0, len(student_ids), LOOKUP_BATCH_SIZE):
+            reviewed.update(models.CourseReview.objects.filter(student_id__in=student_ids[i:i + LOOKUP_BATCH_SIZE])
+                            .values_list("student_id", "course_id"))
+
+        # A pair repeated within the chunk is also only written once
+        new_reviews = []
+        for review in chunk:
+            key = (review.student_id_id, review.course_id_id)
+            if key not in reviewed:
+                reviewed.add(key)
+                new_reviews.append(review)
+        return new_reviews
@@ -0,0 +1,68 @@
+"""
+Imports students from a CSV or JSONL file
+
+    python manage.py import_students students.csv
+
+Columns / keys:
+    email, name, password, gender, age, entry_date, degree_programme
+    - password: plain text, stored with md5() as at registration (or password_md5, already encrypted)
+    - gender: 1 / 2 or Male / Female
+    - entry_date: YYYY-MM-DD
+    - degree_programme: the degree programme name
+
+Students whose email already exists (in the database or earlier in the file) are skipped.
+"""
+
+import datetime
+
+from rmc import models
+from rmc.utils.bulk_import import BaseImportCommand, text_value
+from rmc.utils.encrypt import md5
+
+
+class Command(BaseImportCommand):
+    help = "Streams students from a CSV or JSONL file into rmc_student with batched bulk_create"
+    model = models.Student
+
+    def build_lookups(self):
+        # Degree programme name -> id
+        self.degree_programmes = dict(models.DegreeProgramme.objects.values_list("name", "id"))
+
+        self.genders = {}
+        for value, label in models.Student.gender_choices:
+            self.genders[str(value)] = value
+            self.genders[label.lower()] = value
+
+        self.emails = set(models.Student.objects.exclude(email=None).values_list("email", flat=True))
+
+    def make_object(self, record):
+        email = text_value(record, "email").strip()
+
+        degree_programme = text_value(record, "degree_programme")
+        if degree_programme not in self.degree_programmes:
+            raise ValueError("unknown degree programme {!r}".format(degree_programme))
+
+        gender = self.genders.get(str(record["gender"]).strip().lower())
+        if gender is None:
+            raise ValueError("unknown gender {!r}".format(record["gender"]))
+
+        password = text_value(record, "password_md5", required=False) or md5(text_value(record, "password"))
+
+        return models.Student(
+            email=email,
+            name=text_value(record, "name"),
+            password=password,
+            gender=gender,
+            age=int(record["age"]),
+            entry_date=datetime.date.fromisoformat(text_value(record, "entry_date")),
+            degree_programme_id=self.degree_programmes[degree_programme],
+        )
+
+    def drop_existing(self, chunk):
+        # The emails of the database are loaded once, those written by the import are added to them
+        new_students = []
+        for student in chunk:
+            if student.email not in self.emails:
+                self.emails.add(student.email)
+                new_students.append(student)
+        return new_students
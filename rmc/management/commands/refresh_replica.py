@@ -0,0 +1,36 @@
+"""
+Copies the database to the read replica of the staff views (rmc/utils/replica.py)
+
+    python manage.py refresh_replica
+    python manage.py refresh_replica --every 30
+
+With --every, keeps refreshing the snapshot at that interval (in seconds) until interrupted,
+so the web processes find a fresh snapshot instead of refreshing it themselves.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from rmc.utils import replica
+
+
+class Command(BaseCommand):
+    help = "Copies the primary SQLite database to the read replica with the online backup API"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--every", type=float, help="Refreshes the snapshot at this interval, in seconds")
+
+    def refresh(self):
+        start = time.perf_counter()
+        replica.refresh_snapshot()
+        self.stdout.write("Snapshot refreshed in {:.0f} ms".format((time.perf_counter() - start) * 1000))
+
+    def handle(self, *args, **options):
+        if not replica.is_enabled():
+            raise CommandError("The replica is not enabled, set REPLICA_ENABLED = True in settings.py")
+
+        self.refresh()
+        while options["every"]:
+            time.sleep(options["every"])
+            self.refresh()
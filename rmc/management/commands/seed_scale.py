@@ -0,0 +1,181 @@
+"""
+Generates a large, reproducible data set for benchmarking
+
+    python manage.py seed_scale
+    python manage.py seed_scale --students 100000 --reviews 1000000 --seed 7
+
+Adds degree programmes, courses linked to several programmes, students, staff and course reviews
+next to the existing rows, with batched bulk_create and one transaction per batch.
+The same --seed always generates the same rows.
+
+- Every student belongs to one programme and reviews courses of that programme, each at most once
+  (the number of reviews is capped by the programme sizes)
+- Every course has its own quality, around which its scores are spread
+- The seeded accounts have emails ending in @seed.example.ac.uk and the password given by --password
+
+Run it on a copy of the database: the seeded rows are not removed by any command.
+"""
+
+import datetime
+import itertools
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from rmc import models
+from rmc.utils import table_version
+from rmc.utils.encrypt import md5
+
+SEED_EMAIL_DOMAIN = "seed.example.ac.uk"
+SEED_PROGRAMME_PREFIX = "Seed Programme"
+
+FIRST_NAMES = ["Alex", "Sam", "Jamie", "Morgan", "Taylor", "Jordan", "Casey", "Robin", "Ali", "Mei", "Priya", "Omar",
+               "Anna", "Liam", "Noah", "Emma", "Olivia", "Lucas", "Sofia", "Ivan", "Chen", "Aisha", "Mateo", "Hana"]
+LAST_NAMES = ["Smith", "Brown", "Wilson", "Campbell", "Stewart", "Thomson", "Robertson", "Anderson", "Macdonald",
+              "Scott", "Reid", "Murray", "Taylor", "Clark", "Wang", "Li", "Patel", "Khan", "Garcia", "Novak"]
+SUBJECTS = ["Algorithms", "Databases", "Machine Learning", "Networks", "Security", "Human Computer Interaction",
+            "Software Engineering", "Data Analytics", "Operating Systems", "Distributed Systems", "Cloud Computing",
+            "Computer Vision", "Information Retrieval", "Programming Languages", "Web Development", "Statistics"]
+LEVELS = ["Foundations of", "Advanced", "Applied", "Topics in", "Introduction to", "Research Methods in"]
+COMMENTS = [
+    "", "", "",
+    "Well organised course with useful labs.",
+    "The workload was heavy but the content was worth it.",
+    "Lectures were clear, the assessments less so.",
+    "Interesting topics, I would recommend it.",
+    "Too much theory and not enough practice.",
+    "Great lecturer, very helpful in the labs.",
+]
+
+
+def batches(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class Command(BaseCommand):
+    help = "Generates degree programmes, courses, students, staff and reviews at a configurable scale"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--programmes", type=int, default=20, help="Number of degree programmes")
+        parser.add_argument("--courses", type=int, default=400, help="Number of courses")
+        parser.add_argument("--programmes-per-course", type=int, default=3,
+                            help="Degree programmes each course is linked to")
+        parser.add_argument("--students", type=int, default=100000, help="Number of students")
+        parser.add_argument("--staff", type=int, default=200, help="Number of staff members")
+        parser.add_argument("--reviews", type=int, default=1000000, help="Number of course reviews")
+        parser.add_argument("--seed", type=int, default=42, help="Random seed, the same seed generates the same rows")
+        parser.add_argument("--batch-size", type=int, default=5000, help="Rows per bulk_create and transaction")
+        parser.add_argument("--password", default="Password1", help="Password of the seeded accounts")
+
+    def insert(self, model, objects, batch_size):
+        # Writes the objects batch by batch, so a run of millions of rows keeps a flat memory use
+        count = 0
+        start = time.perf_counter()
+        for batch in batches(objects, batch_size):
+            with transaction.atomic():
+                model.objects.bulk_create(batch, batch_size=batch_size)
+            count += len(batch)
+        table_version.bump_version(model)
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write("  {:<40}{:>10} rows {:>8.1f}s".format(model._meta.db_table, count, elapsed))
+        return count
+
+    def handle(self, *args, **options):
+        if models.Student.objects.filter(email__endswith="@" + SEED_EMAIL_DOMAIN).exists():
+            raise CommandError("The database already contains seeded rows, run the command on a fresh copy")
+        if options["programmes"] < 1 or options["courses"] < 1 or options["students"] < 1:
+            raise CommandError("At least one programme, course and student are needed")
+
+        rng = random.Random(options["seed"])
+        batch_size = options["batch_size"]
+        password = md5(options["password"])
+        start = time.perf_counter()
+        self.stdout.write("Seeding with seed {}".format(options["seed"]))
+
+        # (1) Degree programmes
+        programme_names = ["{} {:03d} MSc".format(SEED_PROGRAMME_PREFIX, i) for i in range(1, options["programmes"] + 1)]
+        self.insert(models.DegreeProgramme, (
+            models.DegreeProgramme(name=name, level=rng.choice([1, 2])) for name in programme_names), batch_size)
+        programme_ids = list(models.DegreeProgramme.objects.filter(name__in=programme_names)
+                             .order_by("id").values_list("id", flat=True))
+
+        # (2) Courses, each with its own quality, linked to several programmes
+        first_course_id = (models.Course.objects.order_by("-id").values_list("id", flat=True).first() or 0) + 1
+        self.insert(models.Course, (
+            models.Course(name="{} {} {}".format(rng.choice(LEVELS), rng.choice(SUBJECTS), i))
+            for i in range(1, options["courses"] + 1)), batch_size)
+        course_ids = list(models.Course.objects.filter(id__gte=first_course_id).order_by("id")
+                          .values_list("id", flat=True))
+        course_quality = {course_id: rng.uniform(3.5, 8.5) for course_id in course_ids}
+
+        programme_courses = {programme_id: [] for programme_id in programme_ids}
+        links = []
+        per_course = min(options["programmes_per_course"], len(programme_ids))
+        for course_id in course_ids:
+            for programme_id in rng.sample(programme_ids, per_course):
+                programme_courses[programme_id].append(course_id)
+                links.append((course_id, programme_id))
+
+        through = models.Course.associated_degree_programmes.through
+        self.insert(through, (through(course_id=course_id, degreeprogramme_id=programme_id)
+                              for course_id, programme_id in links), batch_size)
+
+        # (3) Students and staff
+        def person_name():
+            return "{} {}".format(rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES))
+
+        def entry_date():
+            return datetime.date(rng.randint(2015, 2023), 9, rng.randint(1, 28))
+
+        self.insert(models.Student, (
+            models.Student(email="student{}@{}".format(i, SEED_EMAIL_DOMAIN), name=person_name(), password=password,
+                           gender=rng.choice([1, 2]), age=rng.randint(18, 45), entry_date=entry_date(),
+                           degree_programme_id=rng.choice(programme_ids))
+            for i in range(1, options["students"] + 1)), batch_size)
+
+        self.insert(models.Staff, (
+            models.Staff(email="staff{}@{}".format(i, SEED_EMAIL_DOMAIN), name=person_name(), password=password,
+                         gender=rng.choice([1, 2]))
+            for i in range(1, options["staff"] + 1)), batch_size)
+
+        # (4) Reviews, spread evenly over the students, of distinct courses of each student's programme
+        students = list(models.Student.objects.filter(email__endswith="@" + SEED_EMAIL_DOMAIN)
+                        .order_by("id").values_list("id", "degree_programme_id"))
+        per_student, remainder = divmod(options["reviews"], len(students))
+
+        def score(quality):
+            return min(10, max(1, round(rng.gauss(quality, 1.5))))
+
+        def reviews():
+            for index, (student_id, programme_id) in enumerate(students):
+                courses = programme_courses[programme_id]
+                count = min(per_student + (1 if index < remainder else 0), len(courses))
+                for course_id in rng.sample(courses, count):
+                    quality = course_quality[course_id]
+                    yield models.CourseReview(
+                        student_id_id=student_id, course_id_id=course_id,
+                        overall_score=score(quality), easiness_score=score(quality),
+                        interest_score=score(quality), usefulness_score=score(quality),
+                        teaching_score=score(quality), comment=rng.choice(COMMENTS),
+                    )
+
+        review_count = self.insert(models.CourseReview, reviews(), batch_size)
+        if review_count < options["reviews"]:
+            self.stdout.write("  Only {} reviews fit: each student reviews the courses of one programme at most once"
+                              .format(review_count))
+
+        # (5) Table statistics for the SQLite query planner
+        if connection.vendor == "sqlite":
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+
+        self.stdout.write(self.style.SUCCESS("Done in {:.1f}s. Log in as student1@{} or staff1@{} with {!r}".format(
+            time.perf_counter() - start, SEED_EMAIL_DOMAIN, SEED_EMAIL_DOMAIN, options["password"])))
@@ -0,0 +1,111 @@
+"""
+Cold start report of the worker processes
+
+    python manage.py startup_time
+    python manage.py startup_time --runs 10 --budget-ms 800
+
+Starts fresh Python processes that load projectITECH.wsgi.application and the URLconf (what a worker does
+before serving its first request), and reports the median time and the import time of each package.
+Fails when the median exceeds the budget (settings.STARTUP_TIME_BUDGET_MS),
+or when a module in settings.STARTUP_LAZY_MODULES was imported during the start.
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+PROBE = """
+import json, os, sys, time
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "projectITECH.settings")
+start = time.perf_counter()
+from projectITECH.wsgi import application
+from django.urls import get_resolver
+get_resolver().url_patterns
+elapsed = time.perf_counter() - start
+print(json.dumps({"ms": elapsed * 1000, "modules": sorted(sys.modules)}))
+"""
+
+
+def parse_importtime(stderr):
+    # Lines look like "import time:  self [us] | cumulative | imported package"
+    # The self times are added up per top-level package, e.g. django, rmc, pyecharts
+    packages = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        package = name.strip().split(".")[0]
+        packages[package] = packages.get(package, 0) + int(self_us) / 1000
+    return [(ms, package) for package, ms in packages.items()]
+
+
+class Command(BaseCommand):
+    help = "Reports the cold start time of projectITECH.wsgi.application and fails when it exceeds the budget"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=5, help="Number of fresh processes to start")
+        parser.add_argument("--budget-ms", type=float, default=settings.STARTUP_TIME_BUDGET_MS,
+                            help="Maximum median start time in milliseconds")
+        parser.add_argument("--top", type=int, default=10, help="Number of slowest packages to list")
+        parser.add_argument("--json", dest="json_path", help="Also writes the report to this JSON file")
+
+    def probe(self):
+        env = dict(os.environ)
+        env.setdefault("DJANGO_SETTINGS_MODULE", "projectITECH.settings")
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", PROBE],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            raise CommandError("The start probe failed:\n{}".format(result.stderr[-2000:]))
+
+        data = json.loads(result.stdout.strip().splitlines()[-1])
+        return data["ms"], data["modules"], parse_importtime(result.stderr)
+
+    def handle(self, *args, **options):
+        timings = []
+        modules = []
+        imports = []
+        for _ in range(options["runs"]):
+            ms, modules, imports = self.probe()
+            timings.append(ms)
+
+        median_ms = statistics.median(timings)
+        lazy_loaded = sorted({
+            name for name in modules if name.split(".")[0] in settings.STARTUP_LAZY_MODULES
+        })
+        slowest = sorted(imports, reverse=True)[:options["top"]]
+
+        # (1) Report
+        self.stdout.write("Cold start of projectITECH.wsgi.application over {} runs".format(len(timings)))
+        self.stdout.write("  median {:.1f} ms, min {:.1f} ms, max {:.1f} ms, budget {:.1f} ms".format(
+            median_ms, min(timings), max(timings), options["budget_ms"]))
+        self.stdout.write("Import time per package:")
+        for ms, name in slowest:
+            self.stdout.write("  {:>8.1f} ms  {}".format(ms, name))
+
+        if options["json_path"]:
+            report = {
+                "timings_ms": timings,
+                "median_ms": median_ms,
+                "budget_ms": options["budget_ms"],
+                "import_time_per_package": [{"package": name, "ms": ms} for ms, name in slowest],
+                "lazy_modules_loaded": lazy_loaded,
+            }
+            with open(options["json_path"], "w") as f:
+                json.dump(report, f, indent=2)
+
+        # (2) Checks
+        if lazy_loaded:
+            raise CommandError("Modules that should be imported on first use were loaded at start: {}".format(
+                ", ".join(lazy_loaded)))
+        if median_ms > options["budget_ms"]:
+            raise CommandError("Cold start {:.1f} ms exceeds the budget of {:.1f} ms".format(
+                median_ms, options["budget_ms"]))
+
+        self.stdout.write(self.style.SUCCESS("Cold start is within the budget"))
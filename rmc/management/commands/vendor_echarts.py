@@ -0,0 +1,59 @@
+"""
+Vendors the pinned ECharts library and the chart themes into the static files
+
+    python manage.py vendor_echarts
+    python manage.py vendor_echarts --source https://registry.example.org/npm/echarts@{version}/
+
+Downloads echarts.min.js and the themes used by rmc/views/charts.py, at settings.ECHARTS_VERSION,
+into rmc/static/plugins/echarts-<version>/ (themes in themes/), where the chart pages load them from
+when settings.ECHARTS_ASSETS_HOST is None. Commit the files with the version.
+The sha256 of each file is printed, to be checked against the release.
+"""
+
+import hashlib
+import os
+import urllib.request
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from rmc.views.charts import CHARTS
+
+# The npm package of the release, whose dist/ and theme/ directories are copied
+DEFAULT_SOURCE = "https://cdn.jsdelivr.net/npm/echarts@{version}/"
+
+
+class Command(BaseCommand):
+    help = "Downloads the pinned ECharts library and chart themes into rmc/static/plugins/"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--source", default=DEFAULT_SOURCE,
+                            help="URL of the npm package, {version} is replaced by settings.ECHARTS_VERSION")
+
+    def download(self, url, path):
+        try:
+            with urllib.request.urlopen(url, timeout=30) as response:
+                content = response.read()
+        except OSError as e:
+            raise CommandError("Could not download {}: {}".format(url, e))
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(content)
+        self.stdout.write("  {}  {:>9} bytes  sha256 {}".format(
+            os.path.relpath(path, settings.BASE_DIR), len(content), hashlib.sha256(content).hexdigest()))
+
+    def handle(self, *args, **options):
+        version = settings.ECHARTS_VERSION
+        source = options["source"].format(version=version)
+        directory = os.path.join(settings.BASE_DIR, "rmc", "static", "plugins", "echarts-{}".format(version))
+
+        # (1) The library
+        self.stdout.write("ECharts {} from {}".format(version, source))
+        self.download(source + "dist/echarts.min.js", os.path.join(directory, "echarts.min.js"))
+
+        # (2) The themes of the charts
+        for theme in sorted({theme for _, theme, _, _ in CHARTS.values()}):
+            self.download(source + "theme/{}.js".format(theme), os.path.join(directory, "themes", "{}.js".format(theme)))
+
+        self.stdout.write(self.style.SUCCESS("Vendored into {}".format(os.path.relpath(directory, settings.BASE_DIR))))
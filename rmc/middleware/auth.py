@@ -1,21 +1,64 @@
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.http import HttpResponseForbidden
 from django.utils.deprecation import MiddlewareMixin
+from django.utils.functional import SimpleLazyObject
 from django.shortcuts import redirect
 
+from rmc import models
+from rmc.middleware import routes
+from rmc.middleware.routes import get_route_table
+
+STATIC_PREFIX = "/" + settings.STATIC_URL.lstrip("/")
+
+
+# Loads the logged-in student or staff member from the session info
+# The session info is set by the login views: {"id": ..., "email": ..., "name": ..., "role": "student" or "staff"}
+# The user is always read from the primary database, also in views reading from the replica,
+# so a new account or a profile edit is seen at once
+def get_rmc_user(request):
+    info_dict = request.session.get("info")
+    if not info_dict:
+        return None
+
+    role = info_dict.get("role")
+    if role == "student":
+        return models.Student.objects.using(DEFAULT_DB_ALIAS).select_related("degree_programme").filter(id=info_dict["id"]).first()
+    if role == "staff":
+        return models.Staff.objects.using(DEFAULT_DB_ALIAS).filter(id=info_dict["id"]).first()
+    return None
+
+
 class AuthMiddleware(MiddlewareMixin):
 
     def process_request(self, request):
 
-        # (1) If requesting the login page, continue
-        #     Gets the URL of the user request, request.path_info
-        # if request.path_info == "/login/":
-        if request.path_info in ["/login/", "/staff-login/", "/admin/", "/registration/", "/staff-registration/", "/captcha/",]:
+        # (1) Static files need no session at all
+        if request.path_info.startswith(STATIC_PREFIX):
             return
 
-        # (2) If the session info can be found in the database,
-        #     it means that the user has completed the login, continue
-        info_dict = request.session.get("info")
-        if info_dict:
+        # The logged-in Student or Staff object, loaded on first use and at most once per request
+        # It is falsy when nobody is logged in
+        request.rmc_user = SimpleLazyObject(lambda: get_rmc_user(request))
+
+        # (2) Looks up the role required by the requested URL in the precompiled route table
+        #     Gets the URL of the user request, request.path_info
+        route_table = get_route_table(getattr(request, "urlconf", None))
+        required_role = route_table.role(request.path_info)
+        if required_role == routes.PUBLIC:
             return
 
-        # (3) Redirects to the login page for those has not completed the login
-        return redirect("/login/")
+        # (3) If the session info can be found, it means that the user has completed the login
+        #     Sessions created before the role was recorded have to log in again
+        info_dict = request.session.get("info") or {}
+        role = info_dict.get("role")
+
+        # (4) Redirects to the login page for those has not completed the login
+        if not role:
+            if required_role == routes.STAFF:
+                return redirect("/staff-login/")
+            return redirect("/login/")
+
+        # (5) Logged in with the wrong role, e.g. a student requesting /course-management/
+        if required_role in (routes.STUDENT, routes.STAFF) and role != required_role:
+            return HttpResponseForbidden("Forbidden")
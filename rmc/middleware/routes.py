@@ -0,0 +1,107 @@
+"""
+Route permission table
+
+Built once from the URLconf (projectITECH/urls.py), giving the role required by every route:
+
+    PUBLIC  - anyone, e.g. /login/, /captcha/
+    STUDENT - a logged-in student, e.g. /student-info/
+    STAFF   - a logged-in staff member, e.g. /course-management/
+
+The role of a route comes from the module of its view (VIEW_MODULE_ROLES),
+or from its URL prefix for included URLconfs (PREFIX_ROLES).
+Literal routes are looked up in a dict, and the routes with converters (e.g. <int:courseid>/course-edit/)
+are combined into one regular expression, so a check costs the same however many routes there are.
+"""
+
+import re
+from functools import lru_cache
+
+from django.urls import get_resolver, URLPattern, URLResolver
+
+from rmc.utils.lazy_import import LazyView
+
+PUBLIC = "public"
+STUDENT = "student"
+STAFF = "staff"
+
+# The role required by the views of each module
+VIEW_MODULE_ROLES = {
+    "rmc.views.login": PUBLIC,
+    "rmc.views.register": PUBLIC,
+    "rmc.views.student": STUDENT,
+    "rmc.views.staff": STAFF,
+    "rmc.views.charts": STAFF,
+}
+
+# The role required by included URLconfs, which check permissions themselves
+PREFIX_ROLES = {
+    "admin/": PUBLIC,
+}
+
+# Routes whose view module is not listed above need a login, with any role
+LOGGED_IN = "logged_in"
+
+
+def view_module(callback):
+    # Lazy views are not imported just to find their module
+    if isinstance(callback, LazyView):
+        return callback.dotted_path.rsplit(".", 1)[0]
+    return callback.__module__
+
+
+class RouteTable(object):
+
+    def __init__(self, url_patterns):
+        self.exact = {}
+        self.prefixes = []
+        dynamic = []
+
+        for url_pattern in url_patterns:
+            route = str(url_pattern.pattern)
+
+            # (1) Included URLconfs, matched by prefix
+            if isinstance(url_pattern, URLResolver):
+                self.prefixes.append(("/" + route, PREFIX_ROLES.get(route, LOGGED_IN)))
+                continue
+
+            if not isinstance(url_pattern, URLPattern):
+                continue
+            role = VIEW_MODULE_ROLES.get(view_module(url_pattern.callback), LOGGED_IN)
+
+            # (2) Literal routes, matched by a dict lookup
+            if not getattr(url_pattern.pattern, "converters", None) and not route.startswith("^"):
+                self.exact.setdefault("/" + route, role)
+                continue
+
+            # (3) Routes with converters or regular expressions
+            #     The named groups are made anonymous, as several routes use the same names
+            regex = url_pattern.pattern.regex.pattern.lstrip("^")
+            regex = re.sub(r"\(\?P<\w+>", "(?:", regex)
+            dynamic.append((regex, role))
+
+        self.dynamic_roles = [role for _, role in dynamic]
+        self.dynamic_regex = None
+        if dynamic:
+            alternatives = ["(?P<r{}>{})".format(i, regex) for i, (regex, _) in enumerate(dynamic)]
+            self.dynamic_regex = re.compile("|".join(alternatives))
+
+    def role(self, path):
+        """ Returns the role required by the path, or None if no route matches """
+        role = self.exact.get(path)
+        if role is not None:
+            return role
+
+        for prefix, role in self.prefixes:
+            if path.startswith(prefix):
+                return role
+
+        if self.dynamic_regex is not None:
+            match = self.dynamic_regex.match(path[1:])
+            if match:
+                return self.dynamic_roles[int(match.lastgroup[1:])]
+        return None
+
+
+@lru_cache(maxsize=None)
+def get_route_table(urlconf=None):
+    return RouteTable(get_resolver(urlconf).url_patterns)
@@ -0,0 +1,35 @@
+# Generated by Django 4.1.3 on 2026-10-18 14:25
+
+from django.db import migrations, models
+
+
+def delete_duplicate_reviews(apps, schema_editor):
+    # Keeps the first review of each (student, course) pair, so the constraint can be created
+    CourseReview = apps.get_model("rmc", "CourseReview")
+    duplicates = (
+        CourseReview.objects.values("student_id", "course_id")
+        .annotate(first_id=models.Min("id"), count=models.Count("id"))
+        .filter(count__gt=1)
+    )
+    for row in duplicates:
+        CourseReview.objects.filter(
+            student_id=row["student_id"], course_id=row["course_id"]
+        ).exclude(id=row["first_id"]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("rmc", "0013_remove_course_associated_degree_programme_and_more"),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicate_reviews, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="coursereview",
+            constraint=models.UniqueConstraint(
+                fields=("student_id", "course_id"),
+                name="unique_course_review_per_student",
+            ),
+        ),
+    ]
@@ -0,0 +1,102 @@
+# Generated by Django 4.1.3 on 2026-10-18 14:29
+
+from django.db import migrations, models
+import rmc.models
+
+
+SCORE_FIELDS = ("overall_score", "easiness_score", "interest_score", "usefulness_score", "teaching_score")
+
+
+def clamp_scores(apps, schema_editor):
+    # Scores entered before the form validated them are clamped to 1-10, so the CHECK constraints can be created
+    CourseReview = apps.get_model("rmc", "CourseReview")
+    for field in SCORE_FIELDS:
+        CourseReview.objects.filter(**{"{}__lt".format(field): 1}).update(**{field: 1})
+        CourseReview.objects.filter(**{"{}__gt".format(field): 10}).update(**{field: 10})
+
+
+def clear_blank_and_duplicate_emails(apps, schema_editor):
+    for model_name in ("Student", "Staff"):
+        model = apps.get_model("rmc", model_name)
+
+        # Several accounts without an email would break the unique index, NULLs do not
+        model.objects.filter(email="").update(email=None)
+
+        # Keeps the email on the first account that has it, so the unique index can be created
+        # The other accounts (and their reviews) are kept without an email, to be given a new one by the staff
+        duplicates = (
+            model.objects.exclude(email=None).values("email")
+            .annotate(first_id=models.Min("id"), count=models.Count("id"))
+            .filter(count__gt=1)
+        )
+        for row in duplicates:
+            model.objects.filter(email=row["email"]).exclude(id=row["first_id"]).update(email=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("rmc", "0014_coursereview_unique_student_course"),
+    ]
+
+    operations = [
+        migrations.RunPython(clamp_scores, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="coursereview",
+            name="easiness_score",
+            field=rmc.models.ScoreField(verbose_name="Easiness score"),
+        ),
+        migrations.AlterField(
+            model_name="coursereview",
+            name="interest_score",
+            field=rmc.models.ScoreField(verbose_name="Interest score"),
+        ),
+        migrations.AlterField(
+            model_name="coursereview",
+            name="overall_score",
+            field=rmc.models.ScoreField(verbose_name="Overall score"),
+        ),
+        migrations.AlterField(
+            model_name="coursereview",
+            name="teaching_score",
+            field=rmc.models.ScoreField(verbose_name="Teaching score"),
+        ),
+        migrations.AlterField(
+            model_name="coursereview",
+            name="usefulness_score",
+            field=rmc.models.ScoreField(verbose_name="Usefulness score"),
+        ),
+        migrations.RunPython(clear_blank_and_duplicate_emails, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="staff",
+            name="email",
+            field=models.CharField(
+                blank=True, max_length=64, null=True, unique=True, verbose_name="Email"
+            ),
+        ),
+        migrations.AlterField(
+            model_name="student",
+            name="email",
+            field=models.CharField(
+                blank=True, max_length=64, null=True, unique=True, verbose_name="Email"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="coursereview",
+            index=models.Index(
+                fields=[
+                    "course_id",
+                    "overall_score",
+                    "easiness_score",
+                    "interest_score",
+                    "usefulness_score",
+                    "teaching_score",
+                ],
+                name="rmc_review_course_scores_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="student",
+            index=models.Index(fields=["gender"], name="rmc_student_gender_idx"),
+        ),
+    ]
@@ -0,0 +1,100 @@
+# Generated by Django 4.1.3 on 2026-10-18 14:40
+
+import django.db.models.deletion
+from django.db import migrations, models, transaction
+
+# Students updated per transaction
+BATCH_SIZE = 10000
+
+
+def copy_degree_programme_ids(apps, schema_editor):
+    # Fills the integer key from the programme name in batches of ids, one transaction each,
+    # so a large table is not locked for the whole copy. Rows already copied are skipped,
+    # which lets an interrupted run be resumed.
+    Student = apps.get_model("rmc", "Student")
+    DegreeProgramme = apps.get_model("rmc", "DegreeProgramme")
+    programme_ids = dict(DegreeProgramme.objects.values_list("name", "id"))
+
+    pending = Student.objects.filter(degree_programme_ref__isnull=True)
+    last_id = 0
+    while True:
+        batch = list(
+            pending.filter(id__gt=last_id)
+            .order_by("id")
+            .values_list("id", flat=True)[BATCH_SIZE - 1 : BATCH_SIZE]
+        )
+        upper = {"id__lte": batch[0]} if batch else {}
+        with transaction.atomic(using=schema_editor.connection.alias):
+            for name, programme_id in programme_ids.items():
+                pending.filter(
+                    id__gt=last_id, degree_programme_id=name, **upper
+                ).update(degree_programme_ref=programme_id)
+        if not batch:
+            break
+        last_id = batch[0]
+
+
+def copy_degree_programme_names(apps, schema_editor):
+    Student = apps.get_model("rmc", "Student")
+    DegreeProgramme = apps.get_model("rmc", "DegreeProgramme")
+    for programme_id, name in DegreeProgramme.objects.values_list("id", "name"):
+        Student.objects.filter(degree_programme_ref=programme_id).update(
+            degree_programme=name
+        )
+
+
+class Migration(migrations.Migration):
+
+    # The batches commit one by one
+    atomic = False
+
+    dependencies = [
+        ("rmc", "0015_indexes_and_score_constraints"),
+    ]
+
+    operations = [
+        # (1) Adds the integer key next to the name key
+        #     The name key is made nullable, so that the migration can be reversed
+        migrations.AlterField(
+            model_name="student",
+            name="degree_programme",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                to="rmc.degreeprogramme",
+                to_field="name",
+            ),
+        ),
+        migrations.AddField(
+            model_name="student",
+            name="degree_programme_ref",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="rmc.degreeprogramme",
+            ),
+        ),
+        # (2) Copies the keys
+        migrations.RunPython(
+            copy_degree_programme_ids, copy_degree_programme_names, atomic=False
+        ),
+        # (3) Swaps the columns
+        migrations.RemoveField(
+            model_name="student",
+            name="degree_programme",
+        ),
+        migrations.RenameField(
+            model_name="student",
+            old_name="degree_programme_ref",
+            new_name="degree_programme",
+        ),
+        migrations.AlterField(
+            model_name="student",
+            name="degree_programme",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                to="rmc.degreeprogramme",
+            ),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.1.3 on 2026-10-18 16:05
+
+from django.core.management import call_command
+from django.db import migrations
+
+# Table of the database cache backend (settings.CACHES)
+CACHE_TABLE = "rmc_cache"
+
+
+def create_cache_table(apps, schema_editor):
+    # The cache shared by the worker processes lives in the database, so "migrate" is enough to set it up
+    call_command("createcachetable", database=schema_editor.connection.alias, verbosity=0)
+
+
+def drop_cache_table(apps, schema_editor):
+    schema_editor.execute("DROP TABLE IF EXISTS {}".format(schema_editor.quote_name(CACHE_TABLE)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("rmc", "0016_student_degree_programme_integer_fk"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_cache_table, drop_cache_table),
+    ]
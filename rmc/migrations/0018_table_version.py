@@ -0,0 +1,26 @@
+# Generated by Django 4.1.3 on 2026-10-18 15:09
+
+from django.db import migrations, models
+
+
+def drop_cache_table(apps, schema_editor):
+    # The table versions moved out of the database cache, whose table 0017 created
+    schema_editor.execute("DROP TABLE IF EXISTS {}".format(schema_editor.quote_name("rmc_cache")))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("rmc", "0017_cache_table"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TableVersion",
+            fields=[
+                ("table_name", models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ("version", models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(drop_cache_table, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,21 @@
+from django.core.validators import MinValueValidator, MaxValueValidator
 from django.db import models
 
 
+# Review score from 1 to 10
+# The range is a CHECK constraint of the column, so it is enforced for every write
+# (forms, bulk imports, raw SQL) without the extra query a Meta CheckConstraint costs on form validation
+class ScoreField(models.PositiveSmallIntegerField):
+    default_validators = [MinValueValidator(1), MaxValueValidator(10)]
+
+    def db_check(self, connection):
+        return "%s BETWEEN 1 AND 10" % connection.ops.quote_name(self.column)
+
+
 # (1) Table rmc_student
 class Student(models.Model):
-    email = models.CharField(verbose_name="Email", max_length=64, null=True, blank=True)
+    # Unique, so the login lookup is an index search
+    email = models.CharField(verbose_name="Email", max_length=64, null=True, blank=True, unique=True)
     name = models.CharField(verbose_name="Name", max_length=32)
     password = models.CharField(verbose_name="Password", max_length=64)
 
@@ -16,7 +28,13 @@ class Student(models.Model):
     age = models.IntegerField(verbose_name="Age")
     entry_date = models.DateField(verbose_name="Date of entry")
 
-    degree_programme = models.ForeignKey(to="DegreeProgramme", to_field="name", on_delete=models.CASCADE)
+    degree_programme = models.ForeignKey(to="DegreeProgramme", on_delete=models.CASCADE)
+
+    class Meta:
+        indexes = [
+            # Gender chart: the GROUP BY gender is read from the index only
+            models.Index(fields=["gender"], name="rmc_student_gender_idx"),
+        ]
 
 
 # (2) Table rmc_course
@@ -30,14 +48,30 @@ class CourseReview(models.Model):
     student_id = models.ForeignKey(to="Student", to_field="id", on_delete=models.CASCADE)
     course_id = models.ForeignKey(to="Course", to_field="id", on_delete=models.CASCADE)
 
-    overall_score = models.IntegerField(verbose_name="Overall score")
-    easiness_score = models.IntegerField(verbose_name="Easiness score")
-    interest_score = models.IntegerField(verbose_name="Interest score")
-    usefulness_score = models.IntegerField(verbose_name="Usefulness score")
-    teaching_score = models.IntegerField(verbose_name="Teaching score")
+    overall_score = ScoreField(verbose_name="Overall score")
+    easiness_score = ScoreField(verbose_name="Easiness score")
+    interest_score = ScoreField(verbose_name="Interest score")
+    usefulness_score = ScoreField(verbose_name="Usefulness score")
+    teaching_score = ScoreField(verbose_name="Teaching score")
 
     comment = models.CharField(max_length=300, default='')
 
+    class Meta:
+        constraints = [
+            # A student can review each course only once
+            # Its index also serves the review lookups by student and the (student, course) existence checks
+            models.UniqueConstraint(fields=["student_id", "course_id"], name="unique_course_review_per_student"),
+        ]
+        indexes = [
+            # Covering index for the per-course review counts and average scores of the course list,
+            # which are then computed without reading the table rows
+            models.Index(
+                fields=["course_id", "overall_score", "easiness_score", "interest_score", "usefulness_score",
+                        "teaching_score"],
+                name="rmc_review_course_scores_idx",
+            ),
+        ]
+
 
 # (4) Table rmc_degreeprogramme
 class DegreeProgramme(models.Model):
@@ -58,7 +92,8 @@ class DegreeProgramme(models.Model):
 
 # (5) Table rmc_staff
 class Staff(models.Model):
-    email = models.CharField(verbose_name="Email", max_length=64, null=True, blank=True)
+    # Unique, so the login lookup is an index search
+    email = models.CharField(verbose_name="Email", max_length=64, null=True, blank=True, unique=True)
     name = models.CharField(verbose_name="Name", max_length=32)
     password = models.CharField(verbose_name="Password", max_length=64)
 
@@ -68,3 +103,11 @@ class Staff(models.Model):
     )
     gender = models.SmallIntegerField(verbose_name="Gender", choices=gender_choices)
 
+
+
+# (6) Table rmc_tableversion
+# The version of every rmc table, bumped by each write to it (rmc/utils/table_version.py)
+# One small row per table, shared by the worker processes, so a write invalidates the caches of all of them
+class TableVersion(models.Model):
+    table_name = models.CharField(max_length=64, primary_key=True)
+    version = models.BigIntegerField(default=0)
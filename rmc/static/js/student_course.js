@@ -36,12 +36,21 @@ function doAdd() {
 
                 location.reload();
 
+            } else if (res.tips) {
+                // Display the message, e.g. the course has already been commented
+                alert(res.tips);
             } else {
                 // Display the error message in the box.
                 $.each(res.error, function (name, errorList) {
                     $("#id_" + name).next().text(errorList[0]);
                 })
             }
+        },
+        error: function (xhr) {
+            // e.g. the comment could not be saved in time, it can be submitted again
+            if (xhr.responseJSON && xhr.responseJSON.tips) {
+                alert(xhr.responseJSON.tips);
+            }
         }
     })
 }
@@ -1,3 +1,619 @@
-from django.test import TestCase
+import datetime
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import Future
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.db.models import Avg, Count, Exists, OuterRef
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from rmc import models
+from rmc.middleware.auth import AuthMiddleware
+from rmc.utils import captcha_token, table_version, write_queue
+from rmc.utils.pagination import KeysetPagination, VersionedCount
+from rmc.utils.write_queue import GroupCommitWriter
+
+
+SCORES = {"overall_score": 8, "easiness_score": 7, "interest_score": 6, "usefulness_score": 5, "teaching_score": 4}
+
+
+class SampleData(object):
+    """ A degree programme with three courses, a student of the programme and a staff member """
+
+    @classmethod
+    def create_sample_data(cls):
+        cls.programme = models.DegreeProgramme.objects.create(name="Computing Science MSc", level=2)
+        cls.courses = [models.Course.objects.create(name=name)
+                       for name in ("Operating Systems", "Databases", "Algorithms")]
+        for course in cls.courses:
+            course.associated_degree_programmes.add(cls.programme)
+        cls.course = cls.courses[0]
+        cls.student = models.Student.objects.create(
+            email="s@example.com", name="Student", password="x", gender=1, age=20,
+            entry_date=datetime.date(2022, 9, 1), degree_programme=cls.programme)
+        cls.staff = models.Staff.objects.create(email="t@example.com", name="Staff", password="x", gender=2)
+
+    @classmethod
+    def review(cls, course, student=None, **fields):
+        """ An unsaved review of the course, by the sample student unless another one is given """
+        return models.CourseReview(student_id=student or cls.student, course_id=course, **dict(SCORES, **fields))
+
+
+class SampleDataTestCase(SampleData, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_sample_data()
+
+
+def login(client, user, role):
+    # Logs the test client in with the session info the login views set
+    session = client.session
+    session["info"] = {"id": user.id, "email": user.email, "name": user.name, "role": role}
+    session.save()
+    client.cookies[settings.SESSION_COOKIE_NAME] = session.session_key
+
+
+# Checks with EXPLAIN QUERY PLAN (SQLite) that the hot queries search an index instead of scanning a table
+class HotQueryIndexTests(TestCase):
+
+    def explain(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    # The table can be given by its alias in the query, e.g. U0 in a subquery
+    def assertUsesIndex(self, queryset, table):
+        if connection.vendor != "sqlite":
+            self.skipTest("The query plans are checked on SQLite")
+
+        plan = self.explain(queryset)
+        steps = [step for step in plan if " {} ".format(table) in step + " "]
+        self.assertTrue(steps, "{} is not read by the query: {}".format(table, plan))
+        for step in steps:
+            self.assertRegex(step, r"USING (COVERING )?INDEX|USING INTEGER PRIMARY KEY", plan)
+
+    def test_login_email_lookup(self):
+        self.assertUsesIndex(models.Student.objects.filter(email="a@b.c", password="x"), "rmc_student")
+        self.assertUsesIndex(models.Staff.objects.filter(email="a@b.c", password="x"), "rmc_staff")
+
+    def test_reviews_by_student_and_course(self):
+        self.assertUsesIndex(models.CourseReview.objects.filter(student_id=1), "rmc_coursereview")
+        self.assertUsesIndex(models.CourseReview.objects.filter(course_id=1), "rmc_coursereview")
+
+    def test_review_existence_check(self):
+        self.assertUsesIndex(models.CourseReview.objects.filter(student_id=1, course_id=1), "rmc_coursereview")
+
+        reviewed = models.CourseReview.objects.filter(student_id=1, course_id=OuterRef("pk"))
+        courses = models.Course.objects.annotate(is_comment=Exists(reviewed))
+        self.assertUsesIndex(courses, "U0")
+
+    def test_student_counts_for_charts(self):
+        self.assertUsesIndex(models.Student.objects.filter(gender=1), "rmc_student")
+        self.assertUsesIndex(
+            models.Student.objects.order_by().values_list("gender").annotate(count=Count("id")), "rmc_student")
+        self.assertUsesIndex(
+            models.DegreeProgramme.objects.order_by().values_list("name").annotate(count=Count("student")),
+            "rmc_student")
+
+    def test_course_review_aggregates(self):
+        courses = models.Course.objects.annotate(
+            review_count=Count("coursereview"),
+            avg_overall_score=Avg("coursereview__overall_score"),
+            avg_teaching_score=Avg("coursereview__teaching_score"),
+        )
+        self.assertUsesIndex(courses, "rmc_coursereview")
+        self.assertTrue(any("COVERING INDEX rmc_review_course_scores_idx" in step for step in self.explain(courses)))
+
+
+# The writer thread has its own connection, so the rows must be committed for it to see them
+class GroupCommitWriterTests(SampleData, TransactionTestCase):
+
+    def setUp(self):
+        # The tables are emptied after every test, so the rows are created again
+        self.create_sample_data()
+
+    def test_failed_save_does_not_drop_the_batch(self):
+        writer = GroupCommitWriter(window=0.05)
+        first, second, duplicate, third = [
+            writer.submit(self.review(course)) for course in self.courses[:2] + self.courses[:1] + self.courses[2:]]
+
+        for future in (first, second, third):
+            self.assertIsNone(future.result(timeout=5))
+        self.assertIsInstance(duplicate.exception(timeout=5), IntegrityError)
+        self.assertEqual(models.CourseReview.objects.count(), 3)
+
+    @override_settings(WRITE_QUEUE_ENABLED=True, WRITE_QUEUE_TIMEOUT=0.01)
+    def test_timeout_withdraws_a_save_not_started(self):
+        future = Future()
+        with mock.patch.object(write_queue.get_writer(), "submit", return_value=future):
+            with self.assertRaises(write_queue.SaveTimeout) as raised:
+                write_queue.save(self.review(self.courses[0]))
+        self.assertFalse(raised.exception.pending)
+        self.assertTrue(future.cancelled())
+
+    @override_settings(WRITE_QUEUE_ENABLED=True, WRITE_QUEUE_TIMEOUT=0.01)
+    def test_timeout_of_a_running_save_is_pending(self):
+        future = Future()
+        future.set_running_or_notify_cancel()
+        with mock.patch.object(write_queue.get_writer(), "submit", return_value=future):
+            with self.assertRaises(write_queue.SaveTimeout) as raised:
+                write_queue.save(self.review(self.courses[0]))
+        self.assertTrue(raised.exception.pending)
+
+
+# Every route answers the endpoint benchmark without a server error
+class EndpointBenchmarkTests(SampleDataTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.review(cls.course).save()
+
+    def test_every_route_is_requested(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, "report.json")
+            call_command("bench_endpoints", requests=1, warmup=0, output=output, stdout=io.StringIO(),
+                         stderr=io.StringIO())
+            with open(output) as f:
+                report = json.load(f)
+
+        for name, result in report["endpoints"].items():
+            self.assertLess(result["status"], 500, name)
+        self.assertEqual(report["endpoints"]["GET student-list/"]["status"], 200)
+        self.assertEqual(report["endpoints"]["POST student/addcomments/"]["status"], 200)
+        self.assertIn("logout/", report["skipped"])
+        self.assertEqual(models.CourseReview.objects.count(), 1)
+
+
+# The chart ETags and data depend on table versions kept in the database, shared by the worker processes
+class ChartCacheTests(SampleDataTestCase):
+
+    def setUp(self):
+        login(self.client, self.staff, "staff")
+
+    def test_student_save_invalidates_chart(self):
+        path = "/api/charts/gender-distribution-socs/"
+        etag = self.client.get(path)["ETag"]
+        self.assertEqual(self.client.get(path, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # The versions are rows of rmc_tableversion, which every process reads
+        version = models.TableVersion.objects.get(table_name=models.Student._meta.db_table).version
+
+        # A save is one UPDATE of the version row
+        with self.assertNumQueries(1):
+            table_version.bump_version(models.Student)
+        self.assertGreater(models.TableVersion.objects.get(table_name=models.Student._meta.db_table).version, version)
+
+        models.Student.objects.create(email="s2@example.com", name="Student", password="x", gender=1, age=20,
+                                      entry_date=datetime.date(2022, 9, 1), degree_programme=self.programme)
+        response = self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_chart_page_loads_the_vendored_echarts(self):
+        response = self.client.get("/data-visualisation/degree-programme-enrolment/")
+        self.assertContains(response, '<script src="/static/plugins/echarts-{}/echarts.min.js">'.format(
+            settings.ECHARTS_VERSION))
+        self.assertContains(response, 'themes/westeros.js">')
+
+        with override_settings(ECHARTS_ASSETS_HOST="https://assets.pyecharts.org/assets/"):
+            response = self.client.get("/data-visualisation/degree-programme-enrolment/")
+        self.assertContains(response, '<script src="https://assets.pyecharts.org/assets/echarts.min.js">')
+
+
+# A captcha token is accepted once, the used nonces are kept in memory, without any database write
+class CaptchaTokenTests(TestCase):
+
+    def setUp(self):
+        captcha_token.used_nonces.clear()
+
+    def test_token_is_single_use(self):
+        token = captcha_token.make_token("AB12")
+        with self.assertNumQueries(0):
+            self.assertTrue(captcha_token.check_token(token, "ab12"))
+            self.assertFalse(captcha_token.check_token(token, "ab12"))
+
+    def test_wrong_answer_uses_up_the_token(self):
+        token = captcha_token.make_token("AB12")
+        self.assertFalse(captcha_token.check_token(token, "XXXX"))
+        self.assertFalse(captcha_token.check_token(token, "AB12"))
+
+    @override_settings(CAPTCHA_NONCE_LIMIT=1)
+    def test_full_set_rejects_new_tokens_until_one_expires(self):
+        first, second = captcha_token.make_token("AB12"), captcha_token.make_token("AB12")
+        self.assertTrue(captcha_token.check_token(first, "AB12"))
+        self.assertFalse(captcha_token.check_token(second, "AB12"))
+
+        # The first nonce expires, its token is then rejected by its age
+        with mock.patch("time.time", return_value=time.time() + settings.CAPTCHA_TOKEN_MAX_AGE + 1):
+            self.assertTrue(captcha_token.used_nonces.add("another-nonce", settings.CAPTCHA_TOKEN_MAX_AGE))
+
+
+# AuthMiddleware checks every path against the role its route requires (rmc/middleware/routes.py)
+class RoutePermissionTests(SampleDataTestCase):
+
+    def test_student_cannot_open_staff_routes(self):
+        login(self.client, self.student, "student")
+        self.assertEqual(self.client.get("/course-management/").status_code, 403)
+        self.assertEqual(self.client.get("/{}/course-edit/".format(self.course.id)).status_code, 403)
+        self.assertEqual(self.client.get("/student-info/").status_code, 200)
+
+    def test_staff_cannot_open_student_routes(self):
+        login(self.client, self.staff, "staff")
+        self.assertEqual(self.client.get("/student-info/").status_code, 403)
+        self.assertEqual(self.client.get("/course-management/").status_code, 200)
+
+    def test_anonymous_is_sent_to_the_login_page_of_the_route(self):
+        self.assertRedirects(self.client.get("/student-info/"), "/login/", fetch_redirect_response=False)
+        self.assertRedirects(self.client.get("/course-management/"), "/staff-login/", fetch_redirect_response=False)
+        self.assertRedirects(self.client.get("/{}/course-edit/".format(self.course.id)), "/staff-login/",
+                             fetch_redirect_response=False)
+        self.assertEqual(self.client.get("/login/").status_code, 200)
+
+    def test_unknown_path_needs_a_login(self):
+        self.assertRedirects(self.client.get("/no-such-page/"), "/login/", fetch_redirect_response=False)
+
+    def test_static_and_admin_are_passed_through(self):
+        # Not redirected to the login pages: static files are not served by the tests, the admin checks its own login
+        self.assertEqual(self.client.get("/static/css/missing.css").status_code, 404)
+        self.assertTrue(self.client.get("/admin/")["Location"].startswith("/admin/login/"))
+
+
+# reverse() and redirect() probe every URL pattern, which must not import the lazily loaded view modules
+class LazyViewTests(TestCase):
+
+    # Run in a fresh process, the test process has already imported the views
+    PROBE = """
+import json, os, sys
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "projectITECH.settings")
+import django
+django.setup()
+from django.shortcuts import redirect
+from django.urls import resolve
+redirect("/login/")
+resolve("/student-list/")
+print(json.dumps(sorted(name for name in sys.modules if name.startswith("rmc.views."))))
+"""
+
+    def test_redirect_does_not_import_the_views(self):
+        result = subprocess.run([sys.executable, "-c", self.PROBE], cwd=settings.BASE_DIR,
+                                capture_output=True, text=True, check=True)
+        self.assertEqual(json.loads(result.stdout.strip().splitlines()[-1]), [])
+
+
+# KeysetPagination walks a non-unique ordering in both directions without skipping or repeating a row
+class KeysetPaginationTests(SampleDataTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # Ties on the overall score, broken by the primary key
+        for i, score in enumerate([5, 8, 5, 3, 8, 5, 3]):
+            student = models.Student.objects.create(
+                email="k{}@example.com".format(i), name="Student", password="x", gender=1, age=20,
+                entry_date=datetime.date(2022, 9, 1), degree_programme=cls.programme)
+            cls.review(cls.course, student, overall_score=score).save()
+
+    def page(self, query=""):
+        request = RequestFactory().get("/staff/reviews/" + query)
+        return KeysetPagination(request, models.CourseReview.objects.all(), page_size=3,
+                                ordering=("-overall_score", "id"))
+
+    def test_forward_and_backward_with_ties(self):
+        expected = list(models.CourseReview.objects.order_by("-overall_score", "id"))
+
+        pages = [self.page("?after=")]
+        while pages[-1].has_next:
+            pages.append(self.page("?after={}".format(pages[-1].queryset_page[-1].pk)))
+        self.assertEqual([row for page in pages for row in page.queryset_page], expected)
+        self.assertEqual([len(page.queryset_page) for page in pages], [3, 3, 1])
+
+        pages = [self.page("?before=")]
+        while pages[-1].has_prev:
+            pages.append(self.page("?before={}".format(pages[-1].queryset_page[0].pk)))
+        self.assertEqual([row for page in reversed(pages) for row in page.queryset_page], expected)
+        self.assertEqual([len(page.queryset_page) for page in pages], [3, 3, 1])
+
+    def test_first_and_last_page_links(self):
+        rows = list(models.CourseReview.objects.order_by("-overall_score", "id"))
+
+        first = self.page("?after=&course=1")
+        self.assertEqual(first.queryset_page, rows[:3])
+        self.assertFalse(first.has_prev)
+        self.assertIn('<li><a href="?course=1&after=">First</a></li>', first.tpl())
+
+        last = self.page("?before=")
+        self.assertEqual(last.queryset_page, rows[-3:])
+        self.assertFalse(last.has_next)
+        self.assertIn('<li><a href="?before=">Last</a></li>', last.tpl())
+        self.assertIn('<li class="disabled"><a>Next ></a></li>', last.tpl())
+
+    def test_malformed_cursor_shows_the_first_page(self):
+        first = list(models.CourseReview.objects.order_by("-overall_score", "id")[:3])
+        for query in ("?after=abc", "?before=-1", "?after=99999"):
+            self.assertEqual(self.page(query).queryset_page, first, query)
+
+
+# A VersionedCount is counted again after a save, a delete or an m2m change of a table in its query
+class VersionedCountTests(SampleDataTestCase):
+
+    def count(self, queryset):
+        return VersionedCount()(queryset)
+
+    def test_save_and_delete_invalidate_the_count(self):
+        students = models.Student.objects.filter(degree_programme=self.programme)
+        # Cached, only the table versions are read
+        self.assertEqual(self.count(students), 1)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.count(students), 1)
+
+        student = models.Student.objects.create(
+            email="s2@example.com", name="Student", password="x", gender=1, age=20,
+            entry_date=datetime.date(2022, 9, 1), degree_programme=self.programme)
+        self.assertEqual(self.count(students), 2)
+
+        student.delete()
+        self.assertEqual(self.count(students), 1)
+
+    def test_m2m_change_invalidates_the_count(self):
+        courses = models.Course.objects.filter(associated_degree_programmes=self.programme)
+        self.assertEqual(self.count(courses), 3)
+
+        self.courses[1].associated_degree_programmes.remove(self.programme)
+        self.assertEqual(self.count(courses), 2)
+
+
+# A comment is one programme check, the INSERT and the UPDATE of the table version, committed together
+class AddCommentQueryTests(SampleDataTestCase):
+
+    def test_comment_statements(self):
+        login(self.client, self.student, "student")
+        table_version.bump_version(models.CourseReview)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post("/student/addcomment/?uid={}".format(self.course.id),
+                                        dict(SCORES, comment="Good course"))
+        self.assertEqual(response.json(), {"status": True})
+
+        # The savepoint stands for the transaction of the save outside the tests
+        statements = [query["sql"].split()[0] for query in queries.captured_queries]
+        self.assertEqual(statements, ["SELECT", "SAVEPOINT", "INSERT", "UPDATE", "RELEASE"])
+        self.assertIn("rmc_tableversion", queries.captured_queries[3]["sql"])
+
+
+# A comment committed by another request between the duplicate check and the insert only rejects that comment
+class AddCommentsConflictTests(SampleDataTestCase):
+
+    def setUp(self):
+        login(self.client, self.student, "student")
+
+    def test_concurrent_comment_rejects_only_its_course(self):
+        real_filter = models.CourseReview.objects.filter
+
+        def check_before_concurrent_comment(*args, **kwargs):
+            # The duplicate check runs just before another request commits a comment on the second course
+            self.review(self.courses[1]).save()
+            return real_filter(*args, **kwargs).none()
+
+        reviews = [dict(SCORES, course_id=course.id, comment="Good course") for course in self.courses]
+        with mock.patch.object(models.CourseReview.objects, "filter", check_before_concurrent_comment):
+            response = self.client.post("/student/addcomments/", json.dumps({"reviews": reviews}),
+                                        content_type="application/json")
+
+        results = response.json()["results"]
+        self.assertEqual([result["status"] for result in results], [True, False, True])
+        self.assertEqual(results[1]["tips"], "You have already commented")
+        self.assertEqual(models.CourseReview.objects.count(), 3)
+
+
+# An account registered with the same email between the check and the insert is reported on the form
+class RegistrationRaceTests(SampleDataTestCase):
+
+    def test_concurrent_registration_with_the_same_email(self):
+        real_filter = models.Student.objects.filter
+
+        def check_before_concurrent_registration(*args, **kwargs):
+            # The email checks run just before another request registers the same email
+            if not real_filter(email="n@example.com").exists():
+                models.Student.objects.create(
+                    email="n@example.com", name="Other", password="x", gender=1, age=20,
+                    entry_date=datetime.date(2022, 9, 1), degree_programme=self.programme)
+            return real_filter(*args, **kwargs).none()
+
+        data = {"email": "n@example.com", "name": "New", "password": "secret", "confirm_password": "secret",
+                "gender": 1, "age": 20, "entry_date": "2022-09-01", "degree_programme": self.programme.id}
+        with mock.patch.object(models.Student.objects, "filter", check_before_concurrent_registration):
+            response = self.client.post("/registration/", data)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "This email already exists.")
+        self.assertEqual(real_filter(email="n@example.com").count(), 1)
+
+
+# Invalid records are counted, not raised, and rows that already exist are reported as skipped
+class ImportCommandTests(SampleDataTestCase):
+
+    def run_import(self, command, records):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "records.jsonl")
+            with open(path, "w") as f:
+                f.write("\n".join(json.dumps(record) for record in records))
+            stdout = io.StringIO()
+            call_command(command, path, stdout=stdout, stderr=io.StringIO())
+        return stdout.getvalue()
+
+    def test_null_and_non_string_values_are_invalid(self):
+        student = {"email": "n@example.com", "name": "New", "password": "x", "gender": 1, "age": 20,
+                   "entry_date": "2022-09-01", "degree_programme": "Computing Science MSc"}
+        output = self.run_import("import_students", [
+            dict(student, email=None), dict(student, password=None), dict(student, name=5), [1], student])
+        self.assertIn("1 records written, 0 skipped, 4 invalid", output)
+
+    def test_existing_reviews_are_not_counted_as_written(self):
+        review = dict(SCORES, student_id=self.student.id, course_id=self.course.id)
+        self.assertIn("1 records written, 1 skipped, 0 invalid", self.run_import("import_reviews", [review, review]))
+        self.assertIn("0 records written, 1 skipped, 0 invalid", self.run_import("import_reviews", [review]))
+        self.assertEqual(models.CourseReview.objects.count(), 1)
+
+
+# The student directory lists only the students with reviews, with their programme, in one query
+class StudentListTests(SampleDataTestCase):
+
+    def test_reviewers_only_in_one_query(self):
+        self.review(self.course).save()
+        models.Student.objects.create(email="quiet@example.com", name="Quiet", password="x", gender=2, age=21,
+                                      entry_date=datetime.date(2022, 9, 1), degree_programme=self.programme)
+        login(self.client, self.staff, "staff")
+        self.client.get("/student-list/")
+
+        # The cached count reads the table versions, the page is the second query
+        with self.assertNumQueries(2):
+            response = self.client.get("/student-list/")
+        self.assertContains(response, "s@example.com")
+        self.assertContains(response, "Computing Science MSc")
+        self.assertNotContains(response, "quiet@example.com")
+
+
+# The course list computes the review statistics of every course in one grouped query
+class CourseListTests(SampleDataTestCase):
+
+    def test_aggregates_in_one_query(self):
+        other = models.Student.objects.create(
+            email="s2@example.com", name="Student", password="x", gender=2, age=21,
+            entry_date=datetime.date(2022, 9, 1), degree_programme=self.programme)
+        self.review(self.course, overall_score=8).save()
+        self.review(self.course, other, overall_score=5).save()
+        self.review(self.courses[1], overall_score=3).save()
+        login(self.client, self.staff, "staff")
+        self.client.get("/course-list/?sort=-overall_score")
+
+        # The cached count reads the table versions, the page is the second query,
+        # whatever the number of courses and reviews
+        with self.assertNumQueries(2):
+            response = self.client.get("/course-list/?sort=-overall_score")
+
+        courses = list(response.context["queryset"])
+        self.assertEqual([course.name for course in courses], ["Operating Systems", "Databases"])
+        self.assertEqual((courses[0].review_count, courses[0].avg_overall_score), (2, 6.5))
+        self.assertContains(response, "<td>6.50</td>", html=True)
+        self.assertNotContains(response, "Algorithms")
+
+
+# The review pages look up the name with one primary key query, 404 on an unknown ID, and show an empty list
+class ViewReviewsTests(SampleDataTestCase):
+
+    def setUp(self):
+        login(self.client, self.staff, "staff")
+
+    def test_unknown_id_is_404(self):
+        self.assertEqual(self.client.get("/999/view-reviews-course/").status_code, 404)
+        self.assertEqual(self.client.get("/999/view-reviews-student/").status_code, 404)
+
+    def test_empty_state(self):
+        for path in ("/{}/view-reviews-course/".format(self.course.id),
+                     "/{}/view-reviews-student/".format(self.student.id)):
+            response = self.client.get(path)
+            self.assertContains(response, "No reviews yet.")
+
+    def test_reviews_in_one_query(self):
+        self.review(self.course, comment="Clear lectures").save()
+        path = "/{}/view-reviews-course/".format(self.course.id)
+        self.client.get(path)
+
+        # The course name, the table versions for the cached count, and the reviews with the students joined
+        with self.assertNumQueries(3):
+            response = self.client.get(path)
+        self.assertContains(response, "Clear lectures")
+        self.assertContains(response, '<th scope="row">Student</th>', html=True)
+        self.assertNotContains(response, "No reviews yet.")
+
+
+# request.rmc_user is loaded on first use, once per request, with the degree programme joined
+class RmcUserTests(SampleDataTestCase):
+
+    def request(self, user, role):
+        login(self.client, user, role)
+        request = RequestFactory().get("/student-info/")
+        request.session = self.client.session
+        AuthMiddleware(lambda request: None).process_request(request)
+        return request
+
+    def test_student_loaded_once_with_programme(self):
+        request = self.request(self.student, "student")
+        with self.assertNumQueries(1):
+            self.assertEqual(request.rmc_user.email, "s@example.com")
+            self.assertEqual(request.rmc_user.degree_programme.name, "Computing Science MSc")
+            self.assertEqual(request.rmc_user.name, "Student")
+
+    def test_not_loaded_unless_used(self):
+        login(self.client, self.staff, "staff")
+        request = RequestFactory().get("/course-list/")
+        request.session = self.client.session
+        request.session.get("info")
+        with self.assertNumQueries(0):
+            AuthMiddleware(lambda request: None).process_request(request)
+
+    def test_student_info_page_in_one_query(self):
+        login(self.client, self.student, "student")
+        self.client.get("/student-info/")
+        with self.assertNumQueries(1):
+            response = self.client.get("/student-info/")
+        self.assertContains(response, "Computing Science MSc")
+
+
+# The review exports are streamed from one query, as CSV or JSONL
+class ExportReviewsTests(SampleDataTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.first = cls.review(cls.course, comment='Good, "clear" lectures')
+        cls.first.save()
+        cls.second = cls.review(cls.courses[1], comment="Hard")
+        cls.second.save()
+
+    def setUp(self):
+        login(self.client, self.staff, "staff")
+
+    def export(self, path):
+        response = self.client.get(path)
+        self.assertTrue(response.streaming)
+        with self.assertNumQueries(1):
+            content = b"".join(response.streaming_content).decode("utf-8")
+        return response, content
+
+    def test_csv(self):
+        response, content = self.export("/{}/export-reviews-course/".format(self.course.id))
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        self.assertEqual(response["Content-Disposition"],
+                         'attachment; filename="reviews-course-{}.csv"'.format(self.course.id))
+        self.assertEqual(content.splitlines(), [
+            "review_id,student_id,student_name,student_email,course_id,course_name,"
+            "overall_score,easiness_score,interest_score,usefulness_score,teaching_score,comment",
+            '{},{},Student,s@example.com,{},Operating Systems,8,7,6,5,4,"Good, ""clear"" lectures"'.format(
+                self.first.id, self.student.id, self.course.id),
+        ])
+
+    def test_jsonl(self):
+        response, content = self.export("/{}/export-reviews-student/?format=jsonl".format(self.student.id))
+        self.assertEqual(response["Content-Type"], "application/x-ndjson; charset=utf-8")
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual([row["review_id"] for row in rows], [self.first.id, self.second.id])
+        self.assertEqual(rows[1], dict(SCORES, review_id=self.second.id, student_id=self.student.id,
+                                       student_name="Student", student_email="s@example.com",
+                                       course_id=self.courses[1].id, course_name="Databases", comment="Hard"))
+
+    def test_unknown_id_is_404(self):
+        self.assertEqual(self.client.get("/999/export-reviews-course/").status_code, 404)
+        self.assertEqual(self.client.get("/999/export-reviews-student/").status_code, 404)
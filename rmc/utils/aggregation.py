@@ -0,0 +1,30 @@
+"""
+Instructions for use
+
+Counts the rows of a queryset grouped by one field, with a single GROUP BY query.
+
+    # Number of students of each gender, in the order of the choices (missing choices count as 0)
+    count_by(models.Student.objects.all(), "gender", choices=models.Student.gender_choices)
+    -> [("Male", 18), ("Female", 13)]
+
+    # Number of students in each degree programme, including programmes without students
+    count_by(models.DegreeProgramme.objects.all(), "name", count_field="student")
+    -> [("Computing Science MSc", 9), ("Data Science MSc", 8), ...]
+
+"""
+
+from django.db.models import Count
+
+
+def count_by(queryset, field, count_field="id", choices=None):
+    # (1) SELECT field, COUNT(count_field) ... GROUP BY field
+    #     The ordering is reset so that no other column ends up in the GROUP BY
+    rows = queryset.order_by().values_list(field).annotate(count=Count(count_field)).order_by(field)
+    counts = dict(rows)
+
+    # (2) Without choices, the values of the field are the labels
+    if choices is None:
+        return list(counts.items())
+
+    # (3) With choices, every choice is listed with its display label
+    return [(label, counts.get(value, 0)) for value, label in choices]
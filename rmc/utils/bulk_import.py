@@ -0,0 +1,161 @@
+"""
+Streaming bulk import for management commands
+
+BaseImportCommand reads a CSV (with a header row) or JSONL file one record at a time,
+turns each record into a model instance with make_object(), and writes the instances with
+bulk_create() in chunks, one transaction per chunk. Memory stays flat however large the file is.
+
+The references (courses, students, degree programmes) are resolved through lookup maps
+that a subclass builds once in build_lookups(), never with a query per row.
+
+    python manage.py import_students students.csv
+    python manage.py import_reviews reviews.jsonl --chunk-size 10000 --checkpoint reviews.offset
+
+Resuming: with --checkpoint, the number of records already committed is written to the file after every chunk,
+and a later run with the same file starts after them. --offset skips a given number of records instead.
+
+Records whose row already exists (e.g. from an interrupted run) are found by drop_existing() with one query per chunk,
+and reported as skipped rather than written.
+"""
+
+import csv
+import json
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from rmc.utils import table_version
+
+
+def text_value(record, key, required=True):
+    """ Returns the string of a record field, raises ValueError if it is missing or not a string (e.g. null in JSONL) """
+    value = record.get(key)
+    if value is None or value == "":
+        if required:
+            raise ValueError("{} is required".format(key))
+        return ""
+    if not isinstance(value, str):
+        raise ValueError("{} must be a string, not {!r}".format(key, value))
+    return value
+
+
+def iter_records(path, file_format):
+    # Yields one dict per record, the file is never read as a whole
+    with open(path, newline="", encoding="utf-8") as f:
+        if file_format == "csv":
+            yield from csv.DictReader(f)
+            return
+
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                # Handed to make_object() as an invalid record
+                yield {"_error": "line {}: {}".format(line_number, e)}
+
+
+class BaseImportCommand(BaseCommand):
+    # The model written by the command
+    model = None
+
+    # Errors printed before the rest are only counted
+    max_errors_shown = 20
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV file with a header row, or JSONL file with one object per line")
+        parser.add_argument("--format", choices=["csv", "jsonl"], help="Defaults to the file extension")
+        parser.add_argument("--chunk-size", type=int, default=5000, help="Records per bulk_create and transaction")
+        parser.add_argument("--offset", type=int, default=0, help="Number of records to skip")
+        parser.add_argument("--checkpoint", help="File recording the number of committed records, for resuming")
+
+    def build_lookups(self):
+        """ Loads the maps used by make_object() to resolve references, once per run """
+
+    def make_object(self, record):
+        """ Returns an unsaved model instance for the record, or raises ValueError """
+        raise NotImplementedError
+
+    def drop_existing(self, chunk):
+        """ Returns the instances of the chunk whose row is not in the database yet, the others are skipped """
+        return chunk
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        if not os.path.exists(path):
+            raise CommandError("No such file: {}".format(path))
+
+        file_format = options["format"]
+        if file_format is None:
+            file_format = "csv" if path.lower().endswith(".csv") else "jsonl"
+
+        # (1) Finds where to start
+        offset = options["offset"]
+        checkpoint = options["checkpoint"]
+        if checkpoint and os.path.exists(checkpoint):
+            with open(checkpoint) as f:
+                offset = max(offset, int(f.read().strip() or 0))
+            self.stdout.write("Resuming after record {}".format(offset))
+
+        # (2) Resolves the references once
+        self.build_lookups()
+
+        # (3) Streams the records and writes them chunk by chunk
+        chunk_size = options["chunk_size"]
+        chunk = []
+        position = 0
+        written = 0
+        skipped = 0
+        errors = 0
+        start = time.perf_counter()
+
+        def flush(end_position):
+            nonlocal written, skipped
+            with transaction.atomic():
+                new_objects = self.drop_existing(chunk)
+                # A row written by another process in the meantime still violates a unique constraint and is ignored
+                self.model.objects.bulk_create(new_objects, batch_size=chunk_size, ignore_conflicts=True)
+            written += len(new_objects)
+            skipped += len(chunk) - len(new_objects)
+            chunk.clear()
+
+            if checkpoint:
+                with open(checkpoint, "w") as f:
+                    f.write(str(end_position))
+
+            elapsed = time.perf_counter() - start
+            self.stdout.write("  {} records read, {} written, {} skipped, {} invalid, {:.0f} records/s".format(
+                end_position, written, skipped, errors, (end_position - offset) / elapsed if elapsed else 0))
+
+        for record in iter_records(path, file_format):
+            position += 1
+            if position <= offset:
+                continue
+
+            try:
+                if not isinstance(record, dict):
+                    raise ValueError("expected an object, not {!r}".format(record))
+                if "_error" in record:
+                    raise ValueError(record["_error"])
+                chunk.append(self.make_object(record))
+            except (ValueError, KeyError, TypeError) as e:
+                errors += 1
+                if errors <= self.max_errors_shown:
+                    self.stderr.write("  record {}: {}".format(position, e))
+
+            if len(chunk) >= chunk_size:
+                flush(position)
+
+        if chunk or position > offset:
+            flush(position)
+
+        # bulk_create() sends no post_save signals, so the cached counts and charts are invalidated here
+        table_version.bump_version(self.model)
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS("Done: {} records written, {} skipped, {} invalid, in {:.1f}s".format(
+            written, skipped, errors, elapsed)))
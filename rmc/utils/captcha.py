@@ -1,7 +1,18 @@
 import random
+import threading
+from collections import deque
+from functools import lru_cache
+from io import BytesIO
+
 from PIL import Image, ImageDraw, ImageFont, ImageFilter
 
 
+# The font is loaded once per process instead of on every captcha
+@lru_cache(maxsize=8)
+def load_font(font_file, font_size):
+    return ImageFont.truetype(font_file, font_size)
+
+
 def check_code(width=120, height=30, char_length=5, font_file='Monaco.ttf', font_size=28):
     code = []
     img = Image.new(mode='RGB', size=(width, height), color=(255, 255, 255))
@@ -18,7 +29,7 @@ def check_code(width=120, height=30, char_length=5, font_file='Monaco.ttf', font
         return (random.randint(0, 255), random.randint(10, 255), random.randint(64, 255))
 
     # Draws text
-    font = ImageFont.truetype(font_file, font_size)
+    font = load_font(font_file, font_size)
     for i in range(char_length):
         char = rndChar()
         code.append(char)
@@ -26,12 +37,13 @@ def check_code(width=120, height=30, char_length=5, font_file='Monaco.ttf', font
         draw.text([i * width / char_length, h], char, font=font, fill=rndColor())
 
     # Adds distracting elements (points)
-    for i in range(40):
-        draw.point([random.randint(0, width), random.randint(0, height)], fill=rndColor())
+    # The 80 points are drawn in 8 batches of one colour each, instead of one call per point
+    for i in range(8):
+        points = [(random.randint(0, width), random.randint(0, height)) for _ in range(10)]
+        draw.point(points, fill=rndColor())
 
     # Adds distracting elements (circles)
     for i in range(40):
-        draw.point([random.randint(0, width), random.randint(0, height)], fill=rndColor())
         x = random.randint(0, width)
         y = random.randint(0, height)
         draw.arc((x, y, x + 4, y + 4), 0, 90, fill=rndColor())
@@ -48,3 +60,81 @@ def check_code(width=120, height=30, char_length=5, font_file='Monaco.ttf', font
     img = img.filter(ImageFilter.EDGE_ENHANCE_MORE)
     return img, ''.join(code)
 
+
+def check_code_png(**kwargs):
+    img, code_string = check_code(**kwargs)
+    stream = BytesIO()
+    img.save(stream, "png")
+    return stream.getvalue(), code_string
+
+
+class CaptchaPool(object):
+    """
+    A pool of pre-rendered captcha (PNG, answer) pairs, refilled by a background thread.
+    Each pair is handed out only once. When the pool is empty, the captcha is rendered in the request.
+
+        pool = CaptchaPool(size=200)
+        png, code_string = pool.pop()
+    """
+
+    def __init__(self, size=200, refill_at=0.5, batch_size=20, **kwargs):
+        self.size = size
+        self.refill_at = int(size * refill_at)
+        self.batch_size = batch_size
+        self.kwargs = kwargs
+
+        self.captchas = deque()
+        self.refill_event = threading.Event()
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def start(self):
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.refill_forever, name="captcha-pool", daemon=True)
+                self.thread.start()
+        self.refill_event.set()
+
+    def refill_forever(self):
+        while True:
+            self.refill_event.wait()
+            self.refill_event.clear()
+
+            # Renders in batches until the pool is full
+            while len(self.captchas) < self.size:
+                batch = [check_code_png(**self.kwargs) for _ in range(self.batch_size)]
+                self.captchas.extend(batch)
+
+    def pop(self):
+        if self.thread is None:
+            self.start()
+
+        try:
+            captcha = self.captchas.popleft()
+        except IndexError:
+            captcha = check_code_png(**self.kwargs)
+
+        if len(self.captchas) < self.refill_at:
+            self.refill_event.set()
+        return captcha
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def pop_captcha():
+    """ Returns a (PNG, answer) pair, from the process-level pool if settings.CAPTCHA_POOL_SIZE is set """
+    global _pool
+
+    from django.conf import settings
+
+    pool_size = getattr(settings, "CAPTCHA_POOL_SIZE", 0)
+    if not pool_size:
+        return check_code_png()
+
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = CaptchaPool(size=pool_size)
+    return _pool.pop()
@@ -0,0 +1,88 @@
+"""
+Stateless captcha tokens
+
+The answer of a captcha is bound to a short-lived, HMAC-signed token sent in a cookie,
+instead of being written into the session (one database write per captcha image).
+
+    token = make_token(code_string)          # /captcha/
+    check_token(token, vcode_user_input)     # login, True or False
+
+The token holds a random nonce and a keyed hash of the answer, never the answer itself.
+Each nonce can be checked once: it is recorded in an in-process set until the token expires,
+and a replayed token is rejected, even when the first attempt was wrong.
+A login attempt writes nothing to the database.
+
+The set is per worker process: a token used on one worker can still be checked once on each other worker
+(N tries per captcha with N workers, within its max age). The set holds at most settings.CAPTCHA_NONCE_LIMIT
+nonces; when it is full of unexpired ones, new tokens are rejected (the user gets a new captcha)
+rather than forgetting a nonce that could then be replayed.
+"""
+
+import hashlib
+import hmac
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core import signing
+
+SALT = "rmc.captcha"
+
+
+class UsedNonces(object):
+
+    def __init__(self):
+        # nonce -> expiry time, in the order of use (so also of expiry, as the max age is the same for all)
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def add(self, nonce, timeout):
+        """ Records the nonce, False if it is already recorded or the set is full """
+        now = time.time()
+        with self.lock:
+            # Forgets the expired nonces, their tokens are rejected by their age
+            while self.entries and next(iter(self.entries.values())) <= now:
+                self.entries.popitem(last=False)
+
+            if nonce in self.entries or len(self.entries) >= settings.CAPTCHA_NONCE_LIMIT:
+                return False
+            self.entries[nonce] = now + timeout
+            return True
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+# One set per worker process
+used_nonces = UsedNonces()
+
+
+def answer_digest(nonce, code_string):
+    message = "{}:{}".format(nonce, code_string.upper()).encode("utf-8")
+    return hmac.new(settings.SECRET_KEY.encode("utf-8"), message, hashlib.sha256).hexdigest()
+
+
+def make_token(code_string):
+    nonce = secrets.token_urlsafe(12)
+    return signing.dumps([nonce, answer_digest(nonce, code_string)], salt=SALT)
+
+
+def check_token(token, code_string, max_age=None):
+    if max_age is None:
+        max_age = settings.CAPTCHA_TOKEN_MAX_AGE
+
+    # (1) Verifies the signature and the age of the token
+    try:
+        nonce, digest = signing.loads(token, salt=SALT, max_age=max_age)
+    except (signing.BadSignature, ValueError, TypeError):
+        return False
+
+    # (2) Uses up the nonce, add() fails if it has been seen before
+    if not used_nonces.add(nonce, max_age):
+        return False
+
+    # (3) Compares the answer
+    return hmac.compare_digest(digest, answer_digest(nonce, code_string))
@@ -0,0 +1,65 @@
+"""
+Instructions for use
+
+Streams rows of a values_list() queryset as a CSV or JSONL download, without building model instances
+or holding the whole file in memory. The first bytes are sent as soon as the first rows are read.
+
+    def func(request):
+        rows = models.xxxx.objects.values_list("id", "name")
+        return stream_rows(rows, ["id", "name"], "xxxx", request.GET.get("format", "csv"))
+
+"""
+
+import csv
+import json
+
+from django.http import StreamingHttpResponse
+
+# Rows read from the database per fetch, and rows joined into each chunk of the response
+CHUNK_SIZE = 2000
+
+
+class Echo(object):
+    # A file-like object for csv.writer, which returns the line instead of buffering it
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows, header):
+    writer = csv.writer(Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def jsonl_lines(rows, header):
+    for row in rows:
+        yield json.dumps(dict(zip(header, row)), ensure_ascii=False, default=str) + "\n"
+
+
+def chunked(lines, size=CHUNK_SIZE):
+    # Joins the lines into larger chunks, so the server does not write one line at a time
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) >= size:
+            yield "".join(chunk)
+            chunk = []
+    if chunk:
+        yield "".join(chunk)
+
+
+def stream_rows(queryset, header, filename, file_format="csv"):
+    rows = queryset.iterator(chunk_size=CHUNK_SIZE)
+
+    if file_format == "jsonl":
+        lines = jsonl_lines(rows, header)
+        content_type = "application/x-ndjson"
+    else:
+        file_format = "csv"
+        lines = csv_lines(rows, header)
+        content_type = "text/csv"
+
+    response = StreamingHttpResponse(chunked(lines), content_type="{}; charset=utf-8".format(content_type))
+    response["Content-Disposition"] = 'attachment; filename="{}.{}"'.format(filename, file_format)
+    return response
@@ -0,0 +1,68 @@
+"""
+Instructions for use
+
+Imports the view modules when one of their views is first requested, instead of when the URLconf is loaded.
+
+[1] urls.py
+from rmc.utils.lazy_import import lazy_views
+
+staff, student = lazy_views("rmc.views.staff", "rmc.views.student")
+
+urlpatterns = [
+    path("student-list/", staff.student_list),
+    ...
+]
+
+Attributes of the view, such as csrf_exempt, are read from the imported view.
+The attributes Django and Python only probe for (view_class in reverse() and resolve(), dunders such as
+__wrapped__) are not: they raise AttributeError without importing anything,
+so reverse() and redirect("/login/") do not load the view modules. Only function views can be wrapped.
+"""
+
+from django.utils.module_loading import import_string
+
+# Attributes of class-based views, which Django looks for on every URL pattern
+PROBE_ATTRIBUTES = frozenset(["view_class", "view_initkwargs"])
+
+
+class LazyView(object):
+
+    def __init__(self, dotted_path):
+        self.dotted_path = dotted_path
+        self._view = None
+
+        # Named after the view, not this class, so resolve() and the error reports show the view's path
+        self.__module__, self.__name__ = dotted_path.rsplit(".", 1)
+        self.__qualname__ = self.__name__
+
+    @property
+    def view(self):
+        # Imports the view module on first use
+        if self._view is None:
+            self._view = import_string(self.dotted_path)
+        return self._view
+
+    def __call__(self, request, *args, **kwargs):
+        return self.view(request, *args, **kwargs)
+
+    def __getattr__(self, name):
+        # Only called for attributes that LazyView does not have, e.g. csrf_exempt
+        if name.startswith("_view") or name in PROBE_ATTRIBUTES or (name.startswith("__") and name.endswith("__")):
+            raise AttributeError(name)
+        return getattr(self.view, name)
+
+    def __repr__(self):
+        return "<LazyView {}>".format(self.dotted_path)
+
+
+class LazyViewModule(object):
+
+    def __init__(self, module_path):
+        self.module_path = module_path
+
+    def __getattr__(self, name):
+        return LazyView("{}.{}".format(self.module_path, name))
+
+
+def lazy_views(*module_paths):
+    return [LazyViewModule(module_path) for module_path in module_paths]
@@ -39,24 +39,101 @@ def func(request):
 </body>
 
 
+[3] Count strategies
+Counting every row of a large table on every request is the most expensive part of a page.
+Pass a count strategy to choose how the total number of entries is obtained:
+
+    Pagination(request, queryset)                                      # exact_count, COUNT(*) per request
+    Pagination(request, queryset, count=CachedCount(timeout=60))       # cached for 60s
+    Pagination(request, queryset, count=VersionedCount(models.xxxx))   # cached until a table in the query changes
+
+VersionedCount uses the tables joined by the queryset, plus any models passed in
+(needed for tables only used in subqueries, e.g. Exists()).
+
+
+[4] Cursor (keyset) mode
+For deep pages of large tables, KeysetPagination seeks to "?after=<id>" / "?before=<id>" with a WHERE
+instead of an OFFSET, so page 10000 costs the same as page 1. It never counts the rows.
+"?after=" is the first page and "?before=" the last one, a malformed cursor shows the first page.
+It has the same interface (queryset_page, tpl()) as Pagination.
+
+    if KeysetPagination.is_requested(request):
+        pagination_object = KeysetPagination(request, queryset, ordering=("-overall_score", "id"))
+    else:
+        pagination_object = Pagination(request, queryset)
+
+The ordering columns must not be NULL. The primary key is appended to the ordering
+if it is not the last column, so every row has a distinct position.
+
+
 """
 
+import hashlib
+
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.db.models import Q
 from django.utils.safestring import mark_safe
-import copy
 
+from rmc.utils import table_version
+
+
+########################################
+
+def exact_count(queryset):
+    return queryset.count()
+
+
+class CachedCount(object):
+
+    def __init__(self, timeout=60):
+        self.timeout = timeout
+
+    def cache_key(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        digest = hashlib.md5("{}{}".format(sql, params).encode("utf-8")).hexdigest()
+        return "rmc:pagination-count:{}:{}".format(queryset.db, digest)
+
+    def __call__(self, queryset):
+        try:
+            key = self.cache_key(queryset)
+        except EmptyResultSet:
+            # e.g. filter(id__in=[]), counted without touching the database
+            return queryset.count()
+
+        data_count = cache.get(key)
+        if data_count is None:
+            data_count = queryset.count()
+            cache.set(key, data_count, self.timeout)
+        return data_count
+
+
+class VersionedCount(CachedCount):
+
+    def __init__(self, *models, timeout=60 * 60):
+        super().__init__(timeout=timeout)
+        self.models = models
+
+    def cache_key(self, queryset):
+        tables = [alias.table_name for alias in queryset.query.alias_map.values()]
+        tables.append(queryset.model)
+        versions = table_version.get_versions(*tables, *self.models)
+        return "{}:{}".format(super().cache_key(queryset), versions)
+
+
+########################################
 
 class Pagination(object):
 
-    def __init__(self, request, queryset, page_size=10, page_param="page", deviation=5):
+    def __init__(self, request, queryset, page_size=10, page_param="page", deviation=5, count=exact_count):
 
-        query_dict = copy.deepcopy(request.GET)
-        query_dict._mutable = True
-        self.query_dict = query_dict
+        # The query string is only copied when the navbar is generated
+        self.query_dict = request.GET
         self.page_param = page_param
 
         # (1) Gets the current page number
         page = request.GET.get(page_param, "1")
-        if page.isdecimal():
+        if page.isdecimal() and int(page) > 0:
             page = int(page)
         else:
             page = 1
@@ -65,32 +142,28 @@ class Pagination(object):
         # (2) Sets the pagination block size
         #     For example, 10 data entries per page
         self.page_size = page_size
-        self.data_start = (page - 1) * page_size
-        self.data_end = page * page_size
-
-        # (3) Slices data by the pagination block size
-        self.queryset_page = queryset[self.data_start:self.data_end]
 
-        # (4) Counts the number of all data entries
-        data_count = queryset.count()
+        # (3) Counts the number of all data entries with the given count strategy
+        data_count = count(queryset)
 
-        # (5) Calculates the total number of pages
+        # (4) Calculates the total number of pages
         page_count, remainder = divmod(data_count, page_size)
         if remainder:
             page_count += 1
         self.page_count = page_count
 
-        # (6) Sets (the current page ±5) buttons for user navigation
+        # (5) Sets (the current page ±5) buttons for user navigation
         #     Displays page buttons ranging from [current page -5, current page +5]
         self.deviation = deviation
 
-        # (7) Bug fix for page redirection
-        if self.page <= self.page_count:
-            self.queryset_page = queryset[self.data_start:self.data_end]
-        else:
+        # (6) Bug fix for page redirection
+        if self.page > self.page_count:
             self.page = 1
-            self.queryset_page = queryset[0:self.page_size]
 
+        # (7) Slices data by the pagination block size
+        self.data_start = (self.page - 1) * page_size
+        self.data_end = self.page * page_size
+        self.queryset_page = queryset[self.data_start:self.data_end]
 
     def tpl(self):
 
@@ -117,43 +190,43 @@ class Pagination(object):
                     page_end = self.page + self.deviation
 
         # (8) Generates front-end code for pagination
+        #     The rest of the query string is encoded once and shared by all the links
+        query_dict = self.query_dict.copy()
+        query_dict.pop(self.page_param, None)
+        query_string = query_dict.urlencode()
+        if query_string:
+            query_string += "&"
+        href = "?" + query_string + self.page_param + "={}"
+
         pagination_code = []
 
         # The first page
-        self.query_dict.setlist(self.page_param, [1])
-        pagination_code.append('<li><a href="?{}">First</a></li>'.format(self.query_dict.urlencode()))
+        pagination_code.append('<li><a href="{}">First</a></li>'.format(href.format(1)))
 
         # Previous page
         if self.page > 1:
-            self.query_dict.setlist(self.page_param, [self.page - 1])
-            tpl_prev = '<li><a href="?{}">< Priv</a></li>'.format(self.query_dict.urlencode())
+            tpl_prev = '<li><a href="{}">< Priv</a></li>'.format(href.format(self.page - 1))
         else:
-            self.query_dict.setlist(self.page_param, [1])
-            tpl_prev = '<li><a href="?{}">< Priv</a></li>'.format(self.query_dict.urlencode())
+            tpl_prev = '<li><a href="{}">< Priv</a></li>'.format(href.format(1))
         pagination_code.append(tpl_prev)
 
         # Displays the 5 pages before and after the current page
         for i in range(page_start, page_end + 1):
-            self.query_dict.setlist(self.page_param, [i])
             if i == self.page:
-                tpl = '<li class="active"><a href="?{}">{}</a></li>'.format(self.query_dict.urlencode(), i)
+                tpl = '<li class="active"><a href="{}">{}</a></li>'.format(href.format(i), i)
             else:
-                tpl = '<li><a href="?{}">{}</a></li>'.format(self.query_dict.urlencode(), i)
+                tpl = '<li><a href="{}">{}</a></li>'.format(href.format(i), i)
             pagination_code.append(tpl)
 
         # Next page
         if self.page < self.page_count:
-            self.query_dict.setlist(self.page_param, [self.page + 1])
-            tpl_next = '<li><a href="?{}">Next ></a></li>'.format(self.query_dict.urlencode())
+            tpl_next = '<li><a href="{}">Next ></a></li>'.format(href.format(self.page + 1))
         else:
-            self.query_dict.setlist(self.page_param, [self.page_count])
-            tpl_next = '<li><a href="?{}">Next ></a></li>'.format(self.query_dict.urlencode())
+            tpl_next = '<li><a href="{}">Next ></a></li>'.format(href.format(self.page_count))
         pagination_code.append(tpl_next)
 
         # The last page
-        self.query_dict.setlist(self.page_param, [self.page_count])
-        pagination_code.append('<li><a href="?{}">Last</a></li>'.format(self.query_dict.urlencode()))
-
+        pagination_code.append('<li><a href="{}">Last</a></li>'.format(href.format(self.page_count)))
 
         tpl_redirect = """
         <li>
@@ -170,3 +243,121 @@ class Pagination(object):
         pagination = mark_safe("".join(pagination_code))
 
         return pagination
+
+
+########################################
+
+class KeysetPagination(object):
+
+    def __init__(self, request, queryset, page_size=10, ordering=("pk",), after_param="after", before_param="before"):
+
+        self.query_dict = request.GET
+        self.after_param = after_param
+        self.before_param = before_param
+        self.page_size = page_size
+
+        # (1) Parses the ordering, e.g. ("-overall_score", "id")
+        #     The primary key is appended so that the position of every row is unique
+        ordering = list(ordering)
+        if ordering[-1].lstrip("-") not in ("pk", "id"):
+            ordering.append("pk")
+        self.fields = [(i.lstrip("-"), i.startswith("-")) for i in ordering]
+
+        # (2) Gets the cursor, i.e. the ID of the last (or first) row of the neighbouring page
+        after = request.GET.get(after_param, "")
+        before = request.GET.get(before_param, "")
+
+        # (3) Seeks to the cursor with a WHERE instead of an OFFSET
+        #     One extra row is fetched to know whether there is a further page
+        #     An empty "before" cursor seeks backwards from the end, i.e. to the last page
+        before_values = self._cursor_values(queryset, before)
+        after_values = self._cursor_values(queryset, after)
+        last = before_param in request.GET and before == ""
+        if before_values is not None or last:
+            if last:
+                queryset = queryset.order_by(*self._ordering(forward=False))
+            else:
+                queryset = self._seek(queryset, before_values, forward=False)
+            rows = list(queryset[:page_size + 1])
+            self.has_prev = len(rows) > page_size
+            self.has_next = not last
+            rows = rows[:page_size][::-1]
+        else:
+            if after_values is not None:
+                queryset = self._seek(queryset, after_values, forward=True)
+            else:
+                queryset = queryset.order_by(*ordering)
+            rows = list(queryset[:page_size + 1])
+            self.has_prev = after_values is not None
+            self.has_next = len(rows) > page_size
+            rows = rows[:page_size]
+
+        self.queryset_page = rows
+
+    @staticmethod
+    def is_requested(request, after_param="after", before_param="before"):
+        return after_param in request.GET or before_param in request.GET
+
+    def _cursor_values(self, queryset, cursor):
+        if not cursor.isdecimal():
+            return None
+
+        # Ordering by the primary key only, the cursor is the seek value
+        names = [name for name, _ in self.fields]
+        if names == ["pk"] or names == ["id"]:
+            return {names[0]: int(cursor)}
+
+        # Otherwise, looks up the ordering values (columns or annotations) of the cursor row by its primary key
+        return queryset.order_by().filter(pk=int(cursor)).values(*names).first()
+
+    def _seek(self, queryset, values, forward):
+        # Rows after (or before) the cursor in the lexicographic order of the ordering columns:
+        # (a > x) OR (a = x AND b > y) OR ...
+        condition = Q()
+        for i, (name, descending) in enumerate(self.fields):
+            equal = {field: values[field] for field, _ in self.fields[:i]}
+            lookup = "gt" if descending != forward else "lt"
+            condition |= Q(**equal, **{"{}__{}".format(name, lookup): values[name]})
+
+        return queryset.filter(condition).order_by(*self._ordering(forward))
+
+    def _ordering(self, forward):
+        # The ordering, reversed to read backwards from a cursor
+        return [("-" if descending == forward else "") + name for name, descending in self.fields]
+
+    def _href(self, param=None, value=""):
+        query_dict = self.query_dict.copy()
+        query_dict.pop(self.after_param, None)
+        query_dict.pop(self.before_param, None)
+        query_dict.setlist(param, [value])
+        return "?" + query_dict.urlencode()
+
+    def tpl(self):
+        pagination_code = []
+
+        # The first page
+        pagination_code.append('<li><a href="{}">First</a></li>'.format(self._href(self.after_param)))
+
+        # Previous page, ending just before the first row of this page
+        if self.has_prev and self.queryset_page:
+            tpl_prev = '<li><a href="{}">< Priv</a></li>'.format(
+                self._href(self.before_param, self.queryset_page[0].pk))
+        else:
+            tpl_prev = '<li class="disabled"><a>< Priv</a></li>'
+        pagination_code.append(tpl_prev)
+
+        # Next page, starting just after the last row of this page
+        if self.has_next and self.queryset_page:
+            tpl_next = '<li><a href="{}">Next ></a></li>'.format(
+                self._href(self.after_param, self.queryset_page[-1].pk))
+        else:
+            tpl_next = '<li class="disabled"><a>Next ></a></li>'
+        pagination_code.append(tpl_next)
+
+        # The last page
+        pagination_code.append('<li><a href="{}">Last</a></li>'.format(self._href(self.before_param)))
+
+        # Encapsulates the pagination code
+        pagination = mark_safe("".join(pagination_code))
+
+        return pagination
@@ -0,0 +1,186 @@
+"""
+Instructions for use
+
+A read-only snapshot of the SQLite database for the staff lists and analytics,
+so their heavy reads do not run on the file the students are writing to.
+
+[1] Enable it in settings.py (the "replica" database and the router are then configured there):
+        REPLICA_ENABLED = True
+        REPLICA_PATH = BASE_DIR / "db.replica.sqlite3"
+        REPLICA_MAX_STALENESS = 60      seconds the data of a replica read can be behind the primary
+
+[2] Views opt in with a decorator. Their reads go to the replica, every write goes to the primary:
+
+        @replica.reads_from_replica
+        def student_list(request):
+            ...
+
+    Views that must read their own writes (login, registration, review submission,
+    the pages a form redirects to) are not decorated and read from the primary.
+
+[3] Refreshing: the snapshot is copied from the primary with the sqlite3 online backup API,
+    then moved over the replica file, so a reader never sees a half-copied file.
+    - In WAL mode (SQLITE_PROFILE = "production") the copy is one read transaction, which does not block the writers
+    - With the rollback journal it is copied BACKUP_STEP_PAGES at a time, and the writers commit between the steps.
+      A write restarts the copy, and a copy not finished within half of REPLICA_MAX_STALENESS is given up
+      (the views keep reading the primary until a later refresh succeeds)
+    - A decorated view starts a refresh in the background once the snapshot is half as old as allowed
+    - A snapshot older than REPLICA_MAX_STALENESS (or missing) is not used, the view reads from the primary
+    - "python manage.py refresh_replica --every 30" refreshes it periodically from a separate process
+
+[4] Cache keys built with table_version.get_versions() include the snapshot in replica reads,
+    so counts and charts computed from an older snapshot are not cached as current.
+"""
+
+import contextlib
+import contextvars
+import functools
+import os
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+REPLICA_ALIAS = "replica"
+
+# Pages copied per backup step under the rollback journal, and the pause after each step for the writers
+BACKUP_STEP_PAGES = 1000
+BACKUP_STEP_SLEEP = 0.005
+
+# (alias, snapshot id) of the replica the current view reads from, None for the primary
+_replica_read = contextvars.ContextVar("rmc_replica_read", default=None)
+
+_refresh_lock = threading.Lock()
+
+
+def is_enabled():
+    return getattr(settings, "REPLICA_ENABLED", False) and REPLICA_ALIAS in settings.DATABASES
+
+
+def snapshot_mtime():
+    """ Modification time of the snapshot file in nanoseconds, None when there is no snapshot """
+    try:
+        return os.stat(settings.REPLICA_PATH).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def _backup_progress(deadline):
+    # Pauses after each backup step for the writers, and gives up a copy that the writes keep from finishing
+    def progress(status, remaining, total):
+        if time.monotonic() > deadline:
+            raise sqlite3.OperationalError(
+                "The replica copy did not finish in time, {} of {} pages left".format(remaining, total))
+        time.sleep(BACKUP_STEP_SLEEP)
+
+    return progress
+
+
+def refresh_snapshot():
+    """ Copies the primary database to the replica file """
+    path = str(settings.REPLICA_PATH)
+    tmp_path = "{}.{}-{}.tmp".format(path, os.getpid(), threading.get_ident())
+
+    source = sqlite3.connect(str(settings.DATABASES[DEFAULT_DB_ALIAS]["NAME"]))
+    try:
+        target = sqlite3.connect(tmp_path)
+        try:
+            if source.execute("PRAGMA journal_mode").fetchone()[0].lower() == "wal":
+                # One step, a consistent snapshot of a single read transaction that the writers do not wait for
+                source.backup(target)
+            else:
+                # A read transaction would hold off every write for the whole copy, so the lock is released
+                # after each step. A write in between restarts the copy, which keeps the snapshot consistent.
+                deadline = time.monotonic() + settings.REPLICA_MAX_STALENESS / 2
+                source.backup(target, pages=BACKUP_STEP_PAGES, progress=_backup_progress(deadline))
+            # The replica is opened read-only, which a WAL database cannot be without its -shm file
+            target.execute("PRAGMA journal_mode = DELETE")
+        finally:
+            target.close()
+    except BaseException:
+        # A failed copy does not leave its temporary file behind
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(tmp_path)
+        raise
+    finally:
+        source.close()
+
+    # Connections still open on the old file keep reading it until they are closed at the end of their request
+    os.replace(tmp_path, path)
+
+
+def _refresh_in_background():
+    # At most one refresh per process at a time, the other requests do not wait for it
+    if not _refresh_lock.acquire(blocking=False):
+        return
+
+    def run():
+        try:
+            refresh_snapshot()
+        finally:
+            _refresh_lock.release()
+
+    threading.Thread(target=run, name="replica-refresh", daemon=True).start()
+
+
+def _fresh_snapshot():
+    # Returns the snapshot id if the snapshot can be read, and starts a refresh when it is getting old
+    mtime = snapshot_mtime()
+    max_staleness = settings.REPLICA_MAX_STALENESS
+    age = time.time() - mtime / 1e9 if mtime is not None else None
+
+    if age is None or age > max_staleness / 2:
+        _refresh_in_background()
+    if age is None or age > max_staleness:
+        return None
+    return mtime
+
+
+def reads_from_replica(view):
+    """ Sends the reads of the view to the replica while its snapshot is fresh enough """
+
+    @functools.wraps(view)
+    def inner(request, *args, **kwargs):
+        snapshot = _fresh_snapshot() if is_enabled() else None
+        if snapshot is None:
+            return view(request, *args, **kwargs)
+
+        token = _replica_read.set((REPLICA_ALIAS, snapshot))
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _replica_read.reset(token)
+
+    return inner
+
+
+def read_alias():
+    """ The database alias the current view reads from """
+    current = _replica_read.get()
+    return current[0] if current else DEFAULT_DB_ALIAS
+
+
+def snapshot_key():
+    """ Identifies the snapshot read by the current view in cache keys, empty on the primary """
+    current = _replica_read.get()
+    return "replica{}".format(current[1]) if current else ""
+
+
+class ReplicaRouter(object):
+    """ settings.DATABASE_ROUTERS entry: the reads of decorated views go to the replica, the rest to the primary """
+
+    def db_for_read(self, model, **hints):
+        return read_alias()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both databases hold the same rows
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica is a copy of the primary and is never migrated itself
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,95 @@
+"""
+Database session store with an in-process read cache
+
+    SESSION_ENGINE = "rmc.utils.session_lru"
+
+The database stays the source of truth: every write goes to django_session as with
+django.contrib.sessions.backends.db. Reads are served from a bounded LRU in the worker process,
+so AuthMiddleware does not run a SELECT on every request.
+
+A cached entry lives at most settings.SESSION_LRU_TTL seconds (and never past the session expiry).
+Writes made by another worker process, e.g. a logout, are seen by this process after at most that time.
+"""
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.sessions.backends import db
+
+
+class SessionLRU(object):
+
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, session_key):
+        with self.lock:
+            entry = self.entries.get(session_key)
+            if entry is None:
+                return None
+
+            expires, data = entry
+            if expires <= time.time():
+                del self.entries[session_key]
+                return None
+
+            self.entries.move_to_end(session_key)
+            return copy.deepcopy(data)
+
+    def set(self, session_key, data, expire_date):
+        expires = min(time.time() + settings.SESSION_LRU_TTL, expire_date.timestamp())
+        with self.lock:
+            self.entries[session_key] = (expires, copy.deepcopy(data))
+            self.entries.move_to_end(session_key)
+            while len(self.entries) > settings.SESSION_LRU_SIZE:
+                self.entries.popitem(last=False)
+
+    def delete(self, session_key):
+        with self.lock:
+            self.entries.pop(session_key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+# One cache per worker process
+session_lru = SessionLRU()
+
+
+class SessionStore(db.SessionStore):
+
+    def load(self):
+        # (1) Serves the session from the process cache
+        if self.session_key is not None:
+            data = session_lru.get(self.session_key)
+            if data is not None:
+                return data
+
+        # (2) Otherwise, reads it from the database and caches it
+        s = self._get_session_from_db()
+        if not s:
+            return {}
+
+        data = self.decode(s.session_data)
+        session_lru.set(s.session_key, data, s.expire_date)
+        return data
+
+    def save(self, must_create=False):
+        super().save(must_create=must_create)
+
+        # Written to the database first, then to the process cache
+        if self.session_key is not None:
+            session_lru.set(self.session_key, self._session, self.get_expiry_date())
+
+    def delete(self, session_key=None):
+        if session_key is None:
+            session_key = self.session_key
+        if session_key is not None:
+            session_lru.delete(session_key)
+        super().delete(session_key)
+
@@ -0,0 +1,85 @@
+"""
+Instructions for use
+
+PRAGMAs applied to every new SQLite connection (connected to connection_created in RmcConfig.ready()).
+Opt in from settings.py:
+
+    SQLITE_PROFILE = "production"
+
+    # Optional, overrides single PRAGMAs of the profile
+    SQLITE_PRAGMAS = {"mmap_size": 0, "busy_timeout": 10000}
+
+[1] Profiles
+    None           the stock configuration, nothing is applied
+    "production"   journal_mode=WAL        readers no longer wait for the writer, and the writer does not wait for them
+                   synchronous=NORMAL      in WAL mode, fsync at checkpoints instead of at every commit
+                                           (a power loss can drop the last commits, it cannot corrupt the database)
+                   busy_timeout=5000       a writer waits up to 5 s for the write lock instead of failing at once
+                   mmap_size=256 MB        reads are served from the memory-mapped file
+                   cache_size=-20000       20 MB page cache per connection
+                   temp_store=MEMORY       sorts and temporary tables stay in memory
+
+[2] journal_mode=WAL is stored in the database file and stays after the profile is turned off.
+    Switch back with "PRAGMA journal_mode=DELETE" while no other connection is open.
+
+[3] Compare the profiles with "python manage.py bench_sqlite".
+"""
+
+import re
+
+from django.conf import settings
+
+PROFILES = {
+    None: {},
+    "production": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": 5000,
+        "mmap_size": 256 * 1024 * 1024,
+        "cache_size": -20000,
+        "temp_store": "MEMORY",
+    },
+}
+
+# PRAGMAs not applied to read-only connections
+READ_ONLY_SKIPPED = {"journal_mode", "synchronous"}
+
+_VALID_NAME = re.compile(r"^[a-z_]+$")
+_VALID_VALUE = re.compile(r"^-?\w+$")
+
+
+def get_pragmas(profile=None, overrides=None):
+    """ Returns the PRAGMAs of a profile with the overrides applied, in the order they are executed """
+    if profile not in PROFILES:
+        raise ValueError("Unknown SQLite profile {!r}, expected one of {}".format(
+            profile, ", ".join(repr(i) for i in PROFILES)))
+
+    pragmas = dict(PROFILES[profile])
+    pragmas.update(overrides or {})
+
+    for name, value in pragmas.items():
+        # PRAGMAs cannot take query parameters, so only plain names and values are accepted
+        if not _VALID_NAME.match(name) or not _VALID_VALUE.match(str(value)):
+            raise ValueError("Invalid SQLite PRAGMA {}={!r}".format(name, value))
+    return pragmas
+
+
+def apply_pragmas(db_connection, pragmas):
+    """ Executes the PRAGMAs on a DB-API sqlite3 connection """
+    for name, value in pragmas.items():
+        db_connection.execute("PRAGMA {} = {}".format(name, value))
+
+
+def configure_connection(sender, connection, **kwargs):
+    # Receiver of django.db.backends.signals.connection_created
+    if connection.vendor != "sqlite":
+        return
+
+    pragmas = get_pragmas(getattr(settings, "SQLITE_PROFILE", None), getattr(settings, "SQLITE_PRAGMAS", None))
+
+    # A read-only database (e.g. the replica, "file:...?mode=ro") cannot change its journal
+    if "mode=ro" in str(connection.settings_dict["NAME"]):
+        pragmas = {name: value for name, value in pragmas.items() if name not in READ_ONLY_SKIPPED}
+
+    if pragmas:
+        apply_pragmas(connection.connection, pragmas)
@@ -0,0 +1,95 @@
+"""
+Table versions for cache invalidation
+
+Every rmc table has a version number, kept in one row of rmc_tableversion (models.TableVersion).
+Saving or deleting a row bumps the version of its table (the signals are connected in RmcConfig.ready()),
+so anything cached under a key that includes the versions is invalidated as soon as the data changes.
+
+    key = "my-cache-key:" + table_version.get_versions(models.Student, models.DegreeProgramme)
+
+QuerySet.update(), bulk_create() and raw SQL do not send signals,
+call bump_version(model) after them.
+
+In views reading from the replica (rmc/utils/replica.py) the snapshot is part of the versions,
+as its data can be older than the versions.
+
+The versions are in the database, so they are shared by the worker processes and a bump is part of the
+transaction of the write: a bump is one UPDATE, reading the versions one SELECT.
+The values cached under them (counts, chart data) can then stay in each process's local-memory cache,
+a worker never serves a value cached under an older version.
+"""
+
+import time
+
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_save, post_delete, m2m_changed
+
+from rmc.utils import replica
+
+
+def _table_name(model_or_table):
+    if isinstance(model_or_table, str):
+        return model_or_table
+    return model_or_table._meta.db_table
+
+
+def _new_version():
+    # The versions move forward with the clock (in microseconds) rather than from 1,
+    # so a database restored to older versions does not reuse a version cached since
+    return int(time.time() * 1000000)
+
+
+def get_versions(*models_or_tables):
+    """ Returns the versions of the given models (or table names) as one string for cache keys """
+    from rmc.models import TableVersion
+
+    tables = sorted({_table_name(i) for i in models_or_tables})
+    # Read from the primary also in replica reads, the snapshot is added below
+    versions = dict(TableVersion.objects.using(DEFAULT_DB_ALIAS).filter(table_name__in=tables)
+                    .values_list("table_name", "version"))
+
+    # A table never written to since the versions were introduced has version 0
+    parts = [str(versions.get(table, 0)) for table in tables]
+    if replica.snapshot_key():
+        parts.append(replica.snapshot_key())
+    return "-".join(parts)
+
+
+def bump_version(model_or_table):
+    """ Invalidates everything cached under the current version of the table """
+    from rmc.models import TableVersion
+
+    table = _table_name(model_or_table)
+    new_version = _new_version()
+    updated = TableVersion.objects.filter(table_name=table).update(
+        version=Greatest(F("version") + 1, Value(new_version)))
+    if not updated:
+        # The first write to the table, a row created at the same time by another process is kept
+        TableVersion.objects.bulk_create([TableVersion(table_name=table, version=new_version)], ignore_conflicts=True)
+
+
+def _bump_sender(sender, **kwargs):
+    bump_version(sender)
+
+
+def _bump_m2m(sender, instance, action, **kwargs):
+    if action.startswith("post_"):
+        # The intermediate table changed, and the rows on both sides are now linked differently
+        bump_version(sender)
+        bump_version(instance.__class__)
+        bump_version(kwargs["model"])
+
+
+def connect_signals(app_config):
+    from rmc.models import TableVersion
+
+    for model in app_config.get_models():
+        if model is TableVersion:
+            continue
+        post_save.connect(_bump_sender, sender=model, dispatch_uid="rmc-table-version-save")
+        post_delete.connect(_bump_sender, sender=model, dispatch_uid="rmc-table-version-delete")
+
+        for field in model._meta.many_to_many:
+            m2m_changed.connect(_bump_m2m, sender=field.remote_field.through, dispatch_uid="rmc-table-version-m2m")
@@ -0,0 +1,184 @@
+"""
+Instructions for use
+
+Group commit for SQLite: the saves of many requests are written by one writer thread,
+in one transaction per batch, instead of one transaction (write lock and fsync) per request.
+
+    from rmc.utils import write_queue
+
+    try:
+        write_queue.save(form.instance)
+    except IntegrityError:
+        ...
+
+[1] save() returns once the row is committed, so the request can read its own write afterwards.
+    Errors of the save (e.g. an IntegrityError of a unique constraint) are raised in the request as usual.
+    A failing save does not roll back the others in its batch.
+
+    When the save is not committed within WRITE_QUEUE_TIMEOUT, save() raises SaveTimeout:
+    - e.pending is False: the writer had not started the save, it is withdrawn and can be submitted again
+    - e.pending is True: the writer is saving it, the row may still be committed afterwards
+
+[2] Opt-in from settings.py, otherwise save() writes in the request's own transaction:
+        WRITE_QUEUE_ENABLED = True
+        WRITE_QUEUE_WINDOW_MS = 2       how long the writer waits for more saves after the first one
+        WRITE_QUEUE_MAX_BATCH = 200     saves per transaction
+        WRITE_QUEUE_TIMEOUT = 10        seconds a request waits for its save
+
+[3] The writer is a thread of each worker process, so the saves are grouped per process.
+    Run a few large processes (e.g. gunicorn --threads) rather than many single-threaded ones.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+from django.db import connection, transaction
+
+
+class SaveTimeout(Exception):
+    """ Raised by save() when the save is not committed within settings.WRITE_QUEUE_TIMEOUT """
+
+    def __init__(self, pending):
+        self.pending = pending
+        if pending:
+            message = "The save is taking longer than expected and may still be committed"
+        else:
+            message = "The save was not started in time and has been withdrawn"
+        super().__init__(message)
+
+
+class GroupCommitWriter(object):
+    """
+    A writer thread saving model instances in batches, one transaction per batch.
+
+        writer = GroupCommitWriter(window=0.002, max_batch=200)
+        writer.submit(instance).result(timeout=10)
+    """
+
+    def __init__(self, window=0.002, max_batch=200):
+        self.window = window
+        self.max_batch = max_batch
+
+        self.pending = queue.Queue()
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def start(self):
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.write_forever, name="group-commit-writer", daemon=True)
+                self.thread.start()
+
+    def submit(self, instance):
+        """ Queues instance.save() and returns a Future resolved once it is committed """
+        if self.thread is None:
+            self.start()
+
+        future = Future()
+        self.pending.put((instance, future))
+        return future
+
+    def next_batch(self):
+        # Blocks for the first save, then collects those arriving within the window
+        batch = [self.pending.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self.pending.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def write_batch(self, batch, savepoints):
+        # Returns {future: exception} for the saves that failed, the others are committed on return
+        failed = {}
+        with transaction.atomic():
+            for instance, future in batch:
+                if not savepoints:
+                    instance.save()
+                    continue
+                try:
+                    with transaction.atomic():
+                        instance.save()
+                except Exception as e:
+                    failed[future] = e
+        return failed
+
+    def write_forever(self):
+        while True:
+            batch = [(instance, future) for instance, future in self.next_batch()
+                     if future.set_running_or_notify_cancel()]
+
+            # The thread keeps its connection between batches, whatever CONN_MAX_AGE is,
+            # so the connection PRAGMAs are applied once. A broken connection is replaced.
+            if connection.connection is not None and not connection.is_usable():
+                connection.close()
+
+            # The batch is first written without savepoints. When a save fails, the batch is rolled back
+            # and written again with one savepoint per save, so only the failing saves are dropped.
+            # The primary keys are reset in between, as the first attempt set them on new instances.
+            states = [(instance.pk, instance._state.adding) for instance, _ in batch]
+            try:
+                try:
+                    failed = self.write_batch(batch, savepoints=False)
+                except Exception:
+                    for (instance, _), (pk, adding) in zip(batch, states):
+                        instance.pk, instance._state.adding = pk, adding
+                    failed = self.write_batch(batch, savepoints=True)
+            except Exception as e:
+                # The commit failed, none of the saves of the batch is written
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            for _, future in batch:
+                if future in failed:
+                    future.set_exception(failed[future])
+                else:
+                    future.set_result(None)
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    global _writer
+
+    from django.conf import settings
+
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = GroupCommitWriter(
+                    window=getattr(settings, "WRITE_QUEUE_WINDOW_MS", 2) / 1000,
+                    max_batch=getattr(settings, "WRITE_QUEUE_MAX_BATCH", 200),
+                )
+    return _writer
+
+
+def save(instance):
+    """ Saves the instance through the process-level writer if settings.WRITE_QUEUE_ENABLED is set """
+    from django.conf import settings
+
+    if not getattr(settings, "WRITE_QUEUE_ENABLED", False):
+        with transaction.atomic():
+            instance.save()
+        return
+
+    future = get_writer().submit(instance)
+    try:
+        future.result(timeout=getattr(settings, "WRITE_QUEUE_TIMEOUT", 10))
+    except FutureTimeoutError:
+        # A save the writer has not started is withdrawn, a running one cannot be stopped
+        if future.cancel():
+            raise SaveTimeout(pending=False)
+        if not future.done():
+            raise SaveTimeout(pending=True)
+        # Committed (or failed) in the meantime
+        future.result()
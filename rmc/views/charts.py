@@ -0,0 +1,149 @@
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import JsonResponse, Http404
+from django.shortcuts import render
+from django.templatetags.static import static
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+
+from rmc import models
+from rmc.utils.aggregation import count_by
+from rmc.utils import replica, table_version
+
+# pyecharts is imported by the chart functions on first use,
+# so workers do not load it before a chart is requested
+
+
+########################################
+
+# Chart options
+# Each function returns the ECharts theme and option of a chart, which are rendered in the browser
+
+def gender_distribution_socs():
+    from pyecharts import options as opts
+    from pyecharts.charts import Grid, Pie
+    from pyecharts.globals import ThemeType
+
+    # Counts the students of each gender with one GROUP BY query
+    gender_counts = count_by(models.Student.objects.all(), "gender", choices=models.Student.gender_choices)
+
+    # Creates a grid layout
+    grid = Grid(init_opts=opts.InitOpts(theme=ThemeType.INFOGRAPHIC))
+
+    # Creates a pie chart
+    pie = Pie()
+    pie.set_global_opts(title_opts=opts.TitleOpts(title="Gender Distribution in SoCS", subtitle=""))
+
+    pie.add("", gender_counts)
+    pie.set_series_opts(label_opts=opts.LabelOpts(formatter="{b}:{c}\n{d}%)"))
+
+    grid.add(pie, grid_opts=opts.GridOpts(pos_right="0%"))
+    return grid
+
+
+def degree_programme_enrolment():
+    from pyecharts import options as opts
+    from pyecharts.charts import Grid, Bar
+    from pyecharts.globals import ThemeType
+
+    # Counts the students in every degree programme with one GROUP BY query,
+    # so programmes added later (or without students) are also shown
+    enrolment_counts = count_by(models.DegreeProgramme.objects.all(), "name", count_field="student")
+    degree_programme_names = [name for name, _ in enrolment_counts]
+    student_count_list = [count for _, count in enrolment_counts]
+
+    # Creates a grid layout
+    grid = Grid(init_opts=opts.InitOpts(theme=ThemeType.WESTEROS, ))
+
+    # Creates a bar chart
+    bar = Bar()
+
+    bar.add_xaxis(degree_programme_names)
+    bar.add_yaxis("Number of Students Enrolled", student_count_list)
+    bar.set_global_opts(xaxis_opts=opts.AxisOpts(name_rotate=60, axislabel_opts={"rotate": 15}))
+
+    grid.add(bar, grid_opts=opts.GridOpts(pos_right="0%"))
+    return grid
+
+
+# Chart name in the URL -> (title, theme, tables the chart is drawn from, chart function)
+CHARTS = {
+    "gender-distribution-socs": (
+        "Gender Distribution in SoCS", "infographic",
+        (models.Student,), gender_distribution_socs,
+    ),
+    "degree-programme-enrolment": (
+        "Degree Programme Enrolment", "westeros",
+        (models.Student, models.DegreeProgramme), degree_programme_enrolment,
+    ),
+}
+
+# The chart data is cached until the tables it is drawn from change.
+# The table versions are rows of rmc_tableversion shared by the worker processes,
+# so a write in any process invalidates the data and the ETags of all of them
+CHART_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def get_chart(name):
+    if name not in CHARTS:
+        raise Http404("Unknown chart: {}".format(name))
+    return CHARTS[name]
+
+
+def chart_etag(request, name):
+    # The ETag is made of the table versions only, so a repeat request is answered
+    # with a 304 before any query is run or any chart is built
+    _, _, tables, _ = get_chart(name)
+    return "{}-{}".format(name, table_version.get_versions(*tables))
+
+
+def chart_data(name):
+    _, theme, tables, chart_function = get_chart(name)
+
+    key = "rmc:chart:{}:{}".format(name, table_version.get_versions(*tables))
+    data = cache.get(key)
+    if data is None:
+        option = json.loads(chart_function().dump_options())
+
+        # An empty colour list would override the colours of the theme
+        if not option.get("color"):
+            option.pop("color", None)
+
+        data = {"theme": theme, "option": option}
+        cache.set(key, data, CHART_CACHE_TIMEOUT)
+    return data
+
+
+########################################
+
+# Chart data API
+# http://127.0.0.1:8000/api/charts/gender-distribution-socs/
+
+@replica.reads_from_replica
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=chart_etag)
+def chart_api(request, name):
+    return JsonResponse(chart_data(name), json_dumps_params={"separators": (",", ":")})
+
+
+# Where the browser loads ECharts and its themes from: the vendored static copy, unless a CDN is set
+def echarts_host():
+    if settings.ECHARTS_ASSETS_HOST:
+        return settings.ECHARTS_ASSETS_HOST
+    return static("plugins/echarts-{}/".format(settings.ECHARTS_VERSION))
+
+
+# Chart page, used by the data visualisation views in staff.py
+# The page only contains an empty chart container, which is filled in the browser with the data from the API
+def render_chart_page(request, name):
+    title, theme, _, _ = get_chart(name)
+
+    contents = {
+        "title": title,
+        "theme": theme,
+        "chart_api": "/api/charts/{}/".format(name),
+        "echarts_host": echarts_host(),
+    }
+    return render(request, "chart.html", contents)
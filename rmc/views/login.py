@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.shortcuts import render, redirect, HttpResponse
 from django import forms
 
@@ -5,27 +6,46 @@ from rmc import models
 from rmc.utils.bootstrap import BootStrapModelForm
 
 from rmc.utils.encrypt import md5
-from rmc.utils.captcha import check_code
-from io import BytesIO
+from rmc.utils.captcha_token import make_token, check_token
 
 
 ########################################
 
 # Verification code image
 def captcha(request):
-    img, code_string = check_code()
+    # PIL is imported on the first captcha request, not when the worker starts
+    from rmc.utils.captcha import pop_captcha
+
+    # Takes a pre-rendered image from the captcha pool
+    png, code_string = pop_captcha()
 
     # Digit code for authentication, code_string
     # print(code_string)
 
+    response = HttpResponse(png, content_type="image/png")
+
+    if settings.CAPTCHA_MODE == "signed":
+        # Binds the answer to a signed, single-use token in a cookie, without touching the session
+        response.set_cookie(settings.CAPTCHA_COOKIE_NAME, make_token(code_string),
+                            max_age=settings.CAPTCHA_TOKEN_MAX_AGE, httponly=True, samesite="Lax")
+        return response
+
     # Writes the image verification code to the session
     request.session["captcha"] = code_string
     # Sets the expiry time (60s) for the image verification code
     request.session.set_expiry(60)
 
-    stream = BytesIO()
-    img.save(stream, "png")
-    return HttpResponse(stream.getvalue())
+    return response
+
+
+# Checks the verification code entered by the user, in either captcha mode
+def check_captcha(request, vcode_user_input):
+    if settings.CAPTCHA_MODE == "signed":
+        token = request.COOKIES.get(settings.CAPTCHA_COOKIE_NAME, "")
+        return check_token(token, vcode_user_input)
+
+    vcode = request.session.get("captcha", "")
+    return vcode.upper() == vcode_user_input.upper()
 
 
 ########################################
@@ -60,6 +80,10 @@ class StudentLoginModelForm(BootStrapModelForm):
         pwd = self.cleaned_data.get("password")
         return md5(pwd)
 
+    # The email is unique, but logging in looks up an existing account rather than creating one
+    def validate_unique(self):
+        pass
+
 
 def student_login(request):
     if request.method == "GET":
@@ -71,8 +95,7 @@ def student_login(request):
 
         # CAPTCHA test, before user authentication
         vcode_user_input = form.cleaned_data.pop("verification_code")
-        vcode = request.session.get("captcha", "")
-        if vcode.upper() != vcode_user_input.upper():
+        if not check_captcha(request, vcode_user_input):
             form.add_error("verification_code", "Wrong verification code")
             return render(request, "login.html", {"form": form})
 
@@ -88,7 +111,8 @@ def student_login(request):
 
         # (3) If authentication passes
         #     Creates a session for the user
-        request.session["info"] = {"id": student_object.id, "email": student_object.email, "name": student_object.name}
+        request.session["info"] = {"id": student_object.id, "email": student_object.email, "name": student_object.name,
+                                   "role": "student"}
 
         # Resets the expiry time (1 day) for re-login
         request.session.set_expiry(60 * 60 * 24)
@@ -130,6 +154,10 @@ class StaffLoginModelForm(BootStrapModelForm):
         pwd = self.cleaned_data.get("password")
         return md5(pwd)
 
+    # The email is unique, but logging in looks up an existing account rather than creating one
+    def validate_unique(self):
+        pass
+
 
 def staff_login(request):
     if request.method == "GET":
@@ -141,8 +169,7 @@ def staff_login(request):
 
         # CAPTCHA test, before user authentication
         vcode_user_input = form.cleaned_data.pop("verification_code")
-        vcode = request.session.get("captcha", "")
-        if vcode.upper() != vcode_user_input.upper():
+        if not check_captcha(request, vcode_user_input):
             form.add_error("verification_code", "Wrong verification code")
             return render(request, "staff-login.html", {"form": form})
 
@@ -158,7 +185,8 @@ def staff_login(request):
 
         # (3) If authentication passes
         #     Creates a session for the user
-        request.session["info"] = {"id": staff_object.id, "email": staff_object.email, "name": staff_object.name}
+        request.session["info"] = {"id": staff_object.id, "email": staff_object.email, "name": staff_object.name,
+                                   "role": "staff"}
 
         # Resets the expiry time (1 day) for re-login
         request.session.set_expiry(60 * 60 * 24)
@@ -1,4 +1,5 @@
 from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
 from django.shortcuts import render, redirect, HttpResponse
 from django import forms
 
@@ -66,15 +67,20 @@ def student_registration(request):
         if not obj_email:
             # Creates a new user
             # fields = ["email", "name", "password", "confirm_password", "gender", "age", "entry_date", "degree_programme"]
-            models.Student.objects.create(email=form.cleaned_data.get("email"),
-                                          name=form.cleaned_data.get("name"),
-                                          password=form.cleaned_data.get("password"),
-                                          gender=form.cleaned_data.get("gender"),
-                                          age=form.cleaned_data.get("age"),
-                                          entry_date=form.cleaned_data.get("entry_date"),
-                                          degree_programme=form.cleaned_data.get("degree_programme"))
-
-            return redirect("/login/")
+            # The unique index on the email rejects an account registered with the same email at the same time
+            try:
+                with transaction.atomic():
+                    models.Student.objects.create(email=form.cleaned_data.get("email"),
+                                                  name=form.cleaned_data.get("name"),
+                                                  password=form.cleaned_data.get("password"),
+                                                  gender=form.cleaned_data.get("gender"),
+                                                  age=form.cleaned_data.get("age"),
+                                                  entry_date=form.cleaned_data.get("entry_date"),
+                                                  degree_programme=form.cleaned_data.get("degree_programme"))
+            except IntegrityError:
+                form.add_error("email", "This email already exists.")
+            else:
+                return redirect("/login/")
 
         # Reports an error if the email exists
         else:
@@ -138,12 +144,17 @@ def staff_registration(request):
 
         if not obj_email:
             # Creates a new staff
-            models.Staff.objects.create(email=form.cleaned_data.get("email"),
-                                        name=form.cleaned_data.get("name"),
-                                        password=form.cleaned_data.get("password"),
-                                        gender=form.cleaned_data.get("gender"))
-
-            return redirect("/staff-login/")
+            # The unique index on the email rejects an account registered with the same email at the same time
+            try:
+                with transaction.atomic():
+                    models.Staff.objects.create(email=form.cleaned_data.get("email"),
+                                                name=form.cleaned_data.get("name"),
+                                                password=form.cleaned_data.get("password"),
+                                                gender=form.cleaned_data.get("gender"))
+            except IntegrityError:
+                form.add_error("email", "This email already exists.")
+            else:
+                return redirect("/staff-login/")
 
         # Reports an error if the email exists
         else:
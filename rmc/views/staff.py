@@ -1,15 +1,15 @@
 from django.core.exceptions import ValidationError
-from django.shortcuts import render, redirect, HttpResponse
+from django.db.models import Avg, Count, Exists, Max, OuterRef
+from django.shortcuts import render, redirect, HttpResponse, get_object_or_404
 from django import forms
 
 from rmc import models
 from rmc.utils.bootstrap import BootStrapModelForm
-from rmc.utils.pagination import Pagination
+from rmc.utils.pagination import Pagination, KeysetPagination, VersionedCount
 from rmc.utils.encrypt import md5
-
-from pyecharts import options as opts
-from pyecharts.charts import Page, Grid, Bar, Pie
-from pyecharts.globals import ThemeType
+from rmc.utils.export import stream_rows
+from rmc.utils import replica
+from rmc.views import charts
 
 
 ########################################
@@ -17,9 +17,10 @@ from pyecharts.globals import ThemeType
 def course_management(request):
     # Gets all the data in the rmc_course
     # associated_degree_programmes = models.ManyToManyField(to="DegreeProgramme", related_name="degree_programme_courses")
-    courses = models.Course.objects.prefetch_related("associated_degree_programmes").all()
+    courses = models.Course.objects.prefetch_related("associated_degree_programmes").order_by("id")
 
-    pagination_object = Pagination(request, courses)
+    # The number of courses is cached until rmc_course changes
+    pagination_object = Pagination(request, courses, count=VersionedCount())
 
     contents = {
         # Organises the retrieved data with pagination
@@ -105,25 +106,25 @@ def course_delete(request, courseid):
 
 ########################################
 
-def student_list(request):
-    # Gets all the data in the rmc_student
-    students = models.Student.objects.all()
-
-    # Gets all the students who have made the course reviews
-    students_review = models.CourseReview.objects.all().values("student_id").distinct()
-    # students_review = models.CourseReview.objects.all().values("student_id",
-    #                                                     "student_id__email",
-    #                                                     "student_id__name",
-    #                                                     "student_id__gender",
-    #                                                     "student_id__age",
-    #                                                     "student_id__entry_date",
-    #                                                     "student_id__degree_programme__name")
+# The staff lists, review pages and exports read from the replica when it is enabled (rmc/utils/replica.py)
+# course_management is not, as it shows the changes made by course_add and course_edit
 
-    pagination_object = Pagination(request, students)
+@replica.reads_from_replica
+def student_list(request):
+    # Gets the students who have made course reviews in a single query
+    # (1) The "has reviews" flag is an EXISTS subquery on rmc_coursereview
+    # (2) The degree programme is joined in, so the template does not query it per row
+    student_reviews = models.CourseReview.objects.filter(student_id=OuterRef("pk"))
+    students = models.Student.objects.select_related("degree_programme") \
+        .annotate(has_reviews=Exists(student_reviews)) \
+        .filter(has_reviews=True) \
+        .order_by("id")
+
+    # Counts and slices the filtered set only
+    # The count is cached until rmc_student or rmc_coursereview (used by the subquery) changes
+    pagination_object = Pagination(request, students, count=VersionedCount(models.CourseReview))
 
     contents = {
-        "students_review": students_review,
-
         # Organises the retrieved data with pagination
         "queryset": pagination_object.queryset_page,
 
@@ -135,21 +136,27 @@ def student_list(request):
     return render(request, "student-list.html", contents)
 
 
+@replica.reads_from_replica
 def view_reviews_student(request, studentid):
     # (1) Receives the student ID via URL
     # http://127.0.0.1:8000/1/view-reviews-student/
 
-    # (2) Gets the existing data from the database according to the student ID
-    reviews = models.CourseReview.objects.filter(student_id=studentid)
+    # (2) Gets the student name for display with a single primary key lookup
+    #     Unknown student IDs get a 404
+    student = get_object_or_404(models.Student.objects.only("name"), id=studentid)
 
-    # (3) Extracts the student name from the queryset for display
-    for row in reviews:
-        student_name = row.student_id.name
+    # (3) Gets the reviews according to the student ID, with the course joined in
+    reviews = models.CourseReview.objects.filter(student_id=studentid).select_related("course_id").order_by("id")
 
-    pagination_object = Pagination(request, reviews)
+    # (4) Deep pages can be requested with a cursor (?after=<id>) to avoid the OFFSET cost
+    if KeysetPagination.is_requested(request):
+        pagination_object = KeysetPagination(request, reviews)
+    else:
+        pagination_object = Pagination(request, reviews, count=VersionedCount())
 
     contents = {
-        "student_name": student_name,
+        "student_id": student.id,
+        "student_name": student.name,
 
         # Organises the retrieved data with pagination
         "queryset": pagination_object.queryset_page,
@@ -158,23 +165,58 @@ def view_reviews_student(request, studentid):
         "tpl_pagination_navbar": pagination_object.tpl(),
     }
 
-    # (4) Sends the queryset to the front-end
+    # (5) Sends the queryset to the front-end
     return render(request, "view-reviews-student.html", contents)
 
 
 ########################################
 
+# Columns the course list can be sorted by, mapped to the annotations in course_list
+COURSE_LIST_SORT_FIELDS = {
+    "id": "id",
+    "name": "name",
+    "review_count": "review_count",
+    "overall_score": "avg_overall_score",
+    "easiness_score": "avg_easiness_score",
+    "interest_score": "avg_interest_score",
+    "usefulness_score": "avg_usefulness_score",
+    "teaching_score": "avg_teaching_score",
+    "last_review": "last_review_id",
+}
+
+
+@replica.reads_from_replica
 def course_list(request):
-    # Gets all the data in the rmc_course
-    courses = models.Course.objects.all()
-
-    # Gets all the courses who have the course reviews
-    courses_review = models.CourseReview.objects.all().values("course_id").distinct()
-
-    pagination_object = Pagination(request, courses)
+    # (1) Gets all the courses with review(s) and their review statistics in one grouped query
+    courses = models.Course.objects.annotate(
+        review_count=Count("coursereview"),
+        avg_overall_score=Avg("coursereview__overall_score"),
+        avg_easiness_score=Avg("coursereview__easiness_score"),
+        avg_interest_score=Avg("coursereview__interest_score"),
+        avg_usefulness_score=Avg("coursereview__usefulness_score"),
+        avg_teaching_score=Avg("coursereview__teaching_score"),
+        # Review IDs only increase, so the largest one marks the latest review
+        last_review_id=Max("coursereview__id"),
+    ).filter(review_count__gt=0)
+
+    # (2) Sorts on the server side, e.g. ?sort=-overall_score
+    #     Unknown sort keys fall back to the course ID
+    sort = request.GET.get("sort", "id")
+    field = COURSE_LIST_SORT_FIELDS.get(sort.lstrip("-"))
+    if field is None:
+        sort, field = "id", "id"
+    if sort.startswith("-"):
+        field = "-" + field
+    courses = courses.order_by(field, "id")
+
+    # Deep pages can be requested with a cursor (?after=<id>) in the same sort order
+    if KeysetPagination.is_requested(request):
+        pagination_object = KeysetPagination(request, courses, ordering=(field, "id"))
+    else:
+        pagination_object = Pagination(request, courses, count=VersionedCount())
 
     contents = {
-        "courses_review": courses_review,
+        "sort": sort,
 
         # Organises the retrieved data with pagination
         "queryset": pagination_object.queryset_page,
@@ -187,21 +229,27 @@ def course_list(request):
     return render(request, "course-list.html", contents)
 
 
+@replica.reads_from_replica
 def view_reviews_course(request, courseid):
-    # (1) Receives the student ID via URL
+    # (1) Receives the course ID via URL
     # http://127.0.0.1:8000/1/view-reviews-course/
 
-    # (2) Gets the existing data from the database according to the student ID
-    reviews = models.CourseReview.objects.filter(course_id=courseid)
+    # (2) Gets the course name for display with a single primary key lookup
+    #     Unknown course IDs get a 404
+    course = get_object_or_404(models.Course.objects.only("name"), id=courseid)
 
-    # (3) Extracts the course name from the queryset for display
-    for row in reviews:
-        course_name = row.course_id.name
+    # (3) Gets the reviews according to the course ID, with the student joined in
+    reviews = models.CourseReview.objects.filter(course_id=courseid).select_related("student_id").order_by("id")
 
-    pagination_object = Pagination(request, reviews)
+    # (4) Deep pages can be requested with a cursor (?after=<id>) to avoid the OFFSET cost
+    if KeysetPagination.is_requested(request):
+        pagination_object = KeysetPagination(request, reviews)
+    else:
+        pagination_object = Pagination(request, reviews, count=VersionedCount())
 
     contents = {
-        "course_name": course_name,
+        "course_id": course.id,
+        "course_name": course.name,
 
         # Organises the retrieved data with pagination
         "queryset": pagination_object.queryset_page,
@@ -210,10 +258,58 @@ def view_reviews_course(request, courseid):
         "tpl_pagination_navbar": pagination_object.tpl(),
     }
 
-    # (4) Sends the queryset to the front-end
+    # (5) Sends the queryset to the front-end
     return render(request, "view-reviews-course.html", contents)
 
 
+########################################
+
+# Export reviews as CSV (default) or JSONL, e.g. http://127.0.0.1:8000/1/export-reviews-course/?format=jsonl
+# The rows are streamed straight from the database cursor
+
+REVIEW_EXPORT_FIELDS = [
+    "id",
+    "student_id", "student_id__name", "student_id__email",
+    "course_id", "course_id__name",
+    "overall_score", "easiness_score", "interest_score", "usefulness_score", "teaching_score",
+    "comment",
+]
+REVIEW_EXPORT_HEADER = [
+    "review_id",
+    "student_id", "student_name", "student_email",
+    "course_id", "course_name",
+    "overall_score", "easiness_score", "interest_score", "usefulness_score", "teaching_score",
+    "comment",
+]
+
+
+def export_reviews_rows(**filters):
+    # The rows are read after the view returns, so the database is chosen here
+    return models.CourseReview.objects.using(replica.read_alias()).filter(**filters).order_by("id") \
+        .values_list(*REVIEW_EXPORT_FIELDS)
+
+
+@replica.reads_from_replica
+def export_reviews(request):
+    rows = export_reviews_rows()
+    return stream_rows(rows, REVIEW_EXPORT_HEADER, "reviews", request.GET.get("format", "csv"))
+
+
+@replica.reads_from_replica
+def export_reviews_course(request, courseid):
+    get_object_or_404(models.Course.objects.only("id"), id=courseid)
+    rows = export_reviews_rows(course_id=courseid)
+    return stream_rows(rows, REVIEW_EXPORT_HEADER, "reviews-course-{}".format(courseid), request.GET.get("format", "csv"))
+
+
+@replica.reads_from_replica
+def export_reviews_student(request, studentid):
+    get_object_or_404(models.Student.objects.only("id"), id=studentid)
+    rows = export_reviews_rows(student_id=studentid)
+    return stream_rows(rows, REVIEW_EXPORT_HEADER, "reviews-student-{}".format(studentid),
+                       request.GET.get("format", "csv"))
+
+
 ########################################
 
 # Reset password
@@ -282,56 +378,13 @@ def data_visualisation(request):
     return render(request, "data-visualisation.html")
 
 
+# The charts are rendered in the browser with the data from the chart API (rmc/views/charts.py)
 def gender_distribution_socs(request):
-    page = Page(layout=Page.SimplePageLayout)
-
-    student_male_count = models.Student.objects.filter(gender=1).count()
-    student_female_count = models.Student.objects.filter(gender=2).count()
-
-    # Creates a grid layout
-    grid = Grid(init_opts=opts.InitOpts(theme=ThemeType.INFOGRAPHIC))
-
-    # Creates a pie chart
-    pie = Pie()
-    pie.set_global_opts(title_opts=opts.TitleOpts(title="Gender Distribution in SoCS", subtitle=""))
-
-    pie.add("", list(zip(["Male", "Female"], [student_male_count, student_female_count])))
-    pie.set_series_opts(label_opts=opts.LabelOpts(formatter="{b}:{c}\n{d}%)"))
-
-    grid.add(pie, grid_opts=opts.GridOpts(pos_right="0%"))
-    page.add(grid)
-    return HttpResponse(page.render_embed())
+    return charts.render_chart_page(request, "gender-distribution-socs")
 
 
 def degree_programme_enrolment(request):
-    page = Page(layout=Page.SimplePageLayout)
-
-    degree_programmes = models.DegreeProgramme.objects.all()
-
-    degree_programme_names = []
-    for i in degree_programmes:
-        degree_programme_names.append(i.name)
-
-    student_cs_count = models.Student.objects.filter(degree_programme="Computing Science MSc").count()
-    student_ds_count = models.Student.objects.filter(degree_programme="Data Science MSc").count()
-    student_it_count = models.Student.objects.filter(degree_programme="Information Technology MSc").count()
-    student_sd_count = models.Student.objects.filter(degree_programme="Software Development MSc").count()
-
-    student_count_list = [student_cs_count, student_ds_count, student_it_count, student_sd_count]
-
-    # Creates a grid layout
-    grid = Grid(init_opts=opts.InitOpts(theme=ThemeType.WESTEROS, ))
-
-    # Creates a bar chart
-    bar = Bar()
-
-    bar.add_xaxis(degree_programme_names)
-    bar.add_yaxis("Number of Students Enrolled", student_count_list)
-    bar.set_global_opts(xaxis_opts=opts.AxisOpts(name_rotate=60, axislabel_opts={"rotate": 15}))
-
-    grid.add(bar, grid_opts=opts.GridOpts(pos_right="0%"))
-    page.add(grid)
-    return HttpResponse(page.render_embed())
+    return charts.render_chart_page(request, "degree-programme-enrolment")
 
 
 ########################################
@@ -1,21 +1,25 @@
+import json
+
 from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, OuterRef
 from django.http import JsonResponse
 from django.shortcuts import render, redirect, HttpResponse
 from django import forms
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 
 from rmc import models
 from rmc.utils.bootstrap import BootStrapModelForm
-from rmc.utils.pagination import Pagination
+from rmc.utils.pagination import Pagination, VersionedCount
 from rmc.utils.encrypt import md5
+from rmc.utils import table_version, write_queue
 
 
 def student_info(request):
-    info = request.session["info"]
-
-    # Get the data in rmc_student based on the login ID
-    student = models.Student.objects.get(email=info['email'])
+    # The logged-in student, loaded once by AuthMiddleware with the degree programme joined
+    student = request.rmc_user
     stu_info = {
         "email": student.email,
         "name": student.name,
@@ -35,8 +39,7 @@ class StudentInfoModelForm(BootStrapModelForm):
 
 def student_edit(request):
     """ Edit Student Profile """
-    info = request.session["info"]
-    student = models.Student.objects.filter(id=info['id']).first()
+    student = request.rmc_user
 
     if request.method == "GET":
         # Retrieve the row of data to be edited from the database based on the ID
@@ -47,7 +50,13 @@ def student_edit(request):
     # Get the user input (a ModelForm instance) from the front-end POST request
     form = StudentInfoModelForm(data=request.POST, instance=student)
     if form.is_valid():
-        form.save()
+        # Written by the group commit writer when settings.WRITE_QUEUE_ENABLED is set
+        try:
+            write_queue.save(form.instance)
+        except write_queue.SaveTimeout as e:
+            # The writer is overloaded, the student can submit the form again
+            form.add_error(None, str(e))
+            return render(request, 'student-edit.html', {"form": form}, status=503)
         return redirect('/student-info/')
     return render(request, 'student-edit.html', {"form": form})
 
@@ -88,18 +97,16 @@ class AddCommentModelForm(BootStrapModelForm):
 
 def student_course(request):
     """ Student Course """
-    stu_id = request.session["info"]['id']
-    stu_prog = models.Student.objects.get(id=stu_id).degree_programme.name
+    student = request.rmc_user
 
-    # Get all courses by name of degree_programme
-    degree_id = models.DegreeProgramme.objects.get(name=stu_prog).id
-    queryset = models.Course.objects.filter(associated_degree_programmes=degree_id)
-    for i in queryset:
-        i.isComment = 0
-        isComment = models.CourseReview.objects.filter(student_id=stu_id, course_id=i.id).first()
-        if isComment is not None:
-            i.isComment = 1
+    # Get all courses of the degree_programme (already joined to the student),
+    # with whether the student has commented on each course, in the same query
+    reviewed = models.CourseReview.objects.filter(student_id=student.id, course_id=OuterRef("pk"))
+    queryset = models.Course.objects.filter(associated_degree_programmes=student.degree_programme_id) \
+        .annotate(isComment=Exists(reviewed)) \
+        .order_by("id")
 
+    # A programme has few courses, its count query is cheaper than reading the table versions for a cached one
     pagination_object = Pagination(request, queryset)
 
     course = AddCommentModelForm()
@@ -117,32 +124,139 @@ def student_addcomment(request):
     """ Student Add Comment """
     # Get the student ID and course ID from the front-end request
     stu_id = request.session["info"]['id']
-    uid = request.GET.get("uid")
+    uid = request.GET.get("uid", "")
 
-    # Check if the student has already commented on the course
-    row_object = models.CourseReview.objects.filter(student_id=stu_id, course_id=uid).first()
-    if row_object is not None:
-        return JsonResponse({"status": False, 'tips': "You have already commented"})
     form = AddCommentModelForm(data=request.POST)
+    if not form.is_valid():
+        return JsonResponse({"status": False, 'error': form.errors})
+
+    # Check that the course belongs to the student's degree programme, with one join
+    in_programme = uid.isdecimal() and models.Course.objects.filter(
+        id=uid, associated_degree_programmes__student=stu_id).exists()
+    if not in_programme:
+        return JsonResponse({"status": False, 'tips': "This course is not part of your degree programme"})
+
+    # Assign the IDs directly, without fetching the student and course objects
+    form.instance.student_id_id = stu_id
+    form.instance.course_id_id = int(uid)
+
+    # The unique constraint on (student_id, course_id) rejects a second comment,
+    # also when two submissions arrive at the same time
+    # Written by the group commit writer when settings.WRITE_QUEUE_ENABLED is set
+    try:
+        write_queue.save(form.instance)
+    except IntegrityError:
+        return JsonResponse({"status": False, 'tips': "You have already commented"})
+    except write_queue.SaveTimeout as e:
+        # The writer is overloaded, the comment can be submitted again
+        # (a pending one is then rejected as already commented if it was saved in the meantime)
+        return JsonResponse({"status": False, 'tips': str(e), "retry": True}, status=503)
+
+    return JsonResponse({"status": True})
 
-    if form.is_valid():
-        # Get the student and course object from database based on the ID
-        stu_obj = models.Student.objects.filter(id=stu_id).first()
-        uid_obj = models.Course.objects.filter(id=uid).first()
-        form.instance.student_id = stu_obj
-        form.instance.course_id = uid_obj
-        form.save()
-        return JsonResponse({"status": True})
 
-    return JsonResponse({"status": False, 'error': form.errors})
+# The largest number of comments accepted in one batch
+ADD_COMMENTS_BATCH_MAX = 50
+
+
+@csrf_exempt
+@require_POST
+def student_addcomments(request):
+    """ Student Add Comments, several courses in one request
+
+    POST /student/addcomments/ with a JSON body (Content-Type: application/json):
+    {"reviews": [{"course_id": 1, "overall_score": 8, ..., "comment": "..."}, ...]}
+
+    Returns one result per review, in the same order:
+    {"status": true, "results": [{"course_id": 1, "status": true}, {"course_id": 2, "status": false, "tips": "..."}]}
+    """
+    stu_id = request.session["info"]['id']
+
+    # Only JSON bodies are accepted, so that other sites cannot post the form
+    if request.content_type != "application/json":
+        return JsonResponse({"status": False, 'tips': "Expected a JSON body"}, status=415)
+    try:
+        reviews = json.loads(request.body)["reviews"]
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({"status": False, 'tips': "Expected {\"reviews\": [...]}"}, status=400)
+    if not isinstance(reviews, list) or not 0 < len(reviews) <= ADD_COMMENTS_BATCH_MAX:
+        return JsonResponse({"status": False, 'tips': "Send 1 to {} reviews".format(ADD_COMMENTS_BATCH_MAX)}, status=400)
+
+    # (1) Validates every review with the same rules as a single comment
+    results = []
+    forms_by_course = {}
+    for review in reviews:
+        course_id = review.get("course_id") if isinstance(review, dict) else None
+        result = {"course_id": course_id, "status": False}
+        results.append(result)
+
+        if not isinstance(course_id, int) or isinstance(course_id, bool):
+            result["tips"] = "course_id must be an integer"
+            continue
+        if course_id in forms_by_course:
+            result["tips"] = "The course appears more than once"
+            continue
+
+        form = AddCommentModelForm(data=review)
+        if not form.is_valid():
+            result["error"] = form.errors
+            continue
+        forms_by_course[course_id] = (form, result)
+
+    # (2) Checks the courses against the student's degree programme and existing comments, one query each
+    course_ids = list(forms_by_course)
+    in_programme = set(models.Course.objects.filter(
+        id__in=course_ids, associated_degree_programmes__student=stu_id).values_list("id", flat=True))
+    commented = set(models.CourseReview.objects.filter(
+        student_id=stu_id, course_id__in=course_ids).values_list("course_id", flat=True))
+
+    new_reviews = []
+    for course_id, (form, result) in forms_by_course.items():
+        if course_id not in in_programme:
+            result["tips"] = "This course is not part of your degree programme"
+        elif course_id in commented:
+            result["tips"] = "You have already commented"
+        else:
+            form.instance.student_id_id = stu_id
+            form.instance.course_id_id = course_id
+            new_reviews.append((form.instance, result))
+
+    # (3) Inserts all the new comments with one bulk_create in one transaction
+    #     A comment submitted at the same time by another request violates the unique constraint,
+    #     then the comments are inserted again one by one, each in its own savepoint,
+    #     so only the conflicting ones are rejected
+    if new_reviews:
+        try:
+            with transaction.atomic():
+                models.CourseReview.objects.bulk_create([instance for instance, _ in new_reviews])
+        except IntegrityError:
+            with transaction.atomic():
+                for instance, result in new_reviews:
+                    # The rolled-back bulk_create may have set the primary key
+                    instance.pk, instance._state.adding = None, True
+                    try:
+                        with transaction.atomic():
+                            instance.save()
+                    except IntegrityError:
+                        result["tips"] = "You have already commented"
+                    else:
+                        result["status"] = True
+        else:
+            # bulk_create() sends no post_save signals, so the cached counts are invalidated here
+            table_version.bump_version(models.CourseReview)
+            for _, result in new_reviews:
+                result["status"] = True
+
+    return JsonResponse({"status": True, "results": results})
 
 
 def student_comment(request):
     """ Show Student Comment """
     # Retrieve the comment data from the database based on the student ID
     stu_id = request.session["info"]['id']
-    queryset = models.CourseReview.objects.filter(student_id=stu_id)
-    pagination_object = Pagination(request, queryset)
+    # The course names shown on each row are joined, instead of one query per review
+    queryset = models.CourseReview.objects.filter(student_id=stu_id).select_related("course_id").order_by("id")
+    pagination_object = Pagination(request, queryset, count=VersionedCount())
     contents = {
         "queryset": pagination_object.queryset_page,
         "tpl_pagination_navbar": pagination_object.tpl(),